@@ -29,6 +29,7 @@ source venv/bin/activate
 echo "Installing dependencies..."
 pip install -r requirements.txt
 pip install pyinstaller
+pip install -e .
 
 # Build executable
 echo ""
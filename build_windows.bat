@@ -28,6 +28,7 @@ REM Install dependencies
 echo Installing dependencies...
 pip install -r requirements.txt
 pip install pyinstaller
+pip install -e .
 
 REM Build executable
 echo.
@@ -1,9 +1,4 @@
 import sys
-import os
-
-# Add src to path so we can import rcc package
-src_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
-sys.path.insert(0, src_path)
 
 from rcc.main import main
 
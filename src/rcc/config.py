@@ -1,48 +1,118 @@
-import gc
-from dataclasses import dataclass, field
+import ctypes
+from dataclasses import Field, dataclass, field
 from typing import Optional
 import atexit
 
 
-@dataclass
+_ADDRESS_FIELDS = frozenset({"hostname", "ip", "port"})
+_READINESS_FIELDS = _ADDRESS_FIELDS | {"username", "password", "admin_password"}
+
+_STATUS_CONNECTED_TPL = "[success]%s[/success] [dim]● Connected[/dim]"
+_STATUS_PENDING_TPL = "[input]%s[/input] [dim](credentials needed)[/dim]"
+
+
+def _zeroize(buf: bytearray) -> None:
+    size = len(buf)
+    if size:
+        view = (ctypes.c_char * size).from_buffer(buf)
+        ctypes.memset(ctypes.addressof(view), 0, size)
+        del view
+    buf.clear()
+
+
+def _secret(slot: str) -> property:
+    # Credentials live in a bytearray so they can be overwritten in place;
+    # str values are immutable and linger until the allocator reuses them.
+    # Only that stored buffer is wiped: each read decodes a fresh str for the
+    # caller (JSON bodies, OS WiFi commands and the MQTT client all need str),
+    # and those copies are left to the garbage collector.
+    def fget(self) -> str:
+        return getattr(self, slot).decode()
+
+    def fset(self, value: str) -> None:
+        _zeroize(getattr(self, slot))
+        object.__setattr__(self, slot, bytearray(value.encode()))
+
+    return property(fget, fset)
+
+
+def _secret_field(default: bytes = b"") -> "Field[bytearray]":
+    return field(default_factory=lambda: bytearray(default), init=False, repr=False, compare=False)
+
+
+@dataclass(slots=True)
 class BrokerConfig:
     hostname: str = "RCCServer.local"
     ip: Optional[str] = None
     port: int = 1883
-    username: str = "DeviceRCC"
-    password: str = ""
     admin_username: str = "ToolRCC"
-    admin_password: str = ""
+    _username: bytearray = _secret_field(b"DeviceRCC")
+    _password: bytearray = _secret_field()
+    _admin_password: bytearray = _secret_field()
+    _address: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _connection_string: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _configured: Optional[bool] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __setattr__(self, name: str, value) -> None:
+        object.__setattr__(self, name, value)
+        if name in _READINESS_FIELDS:
+            object.__setattr__(self, "_configured", None)
+            if name in _ADDRESS_FIELDS:
+                object.__setattr__(self, "_address", None)
+                object.__setattr__(self, "_connection_string", None)
+    
+    username = _secret("_username")
+    password = _secret("_password")
+    admin_password = _secret("_admin_password")
     
     @property
     def address(self) -> str:
-        return self.ip or self.hostname
+        if self._address is None:
+            self._address = self.ip or self.hostname
+        return self._address
     
     @property
     def connection_string(self) -> str:
-        return f"{self.address}:{self.port}"
+        if self._connection_string is None:
+            self._connection_string = f"{self.address}:{self.port}"
+        return self._connection_string
     
     def is_configured(self) -> bool:
-        return bool(self.address and self.username and self.password and self.admin_password)
+        if self._configured is None:
+            self._configured = bool(self.address and self._username and self._password and self._admin_password)
+        return self._configured
+    
+    def clear_secrets(self) -> None:
+        _zeroize(self._username)
+        _zeroize(self._password)
+        _zeroize(self._admin_password)
+        self._configured = None
 
 
-@dataclass
+@dataclass(slots=True)
 class WiFiConfig:
-    ssid: str = ""
-    password: str = ""
+    _ssid: bytearray = _secret_field()
+    _password: bytearray = _secret_field()
+    
+    ssid = _secret("_ssid")
+    password = _secret("_password")
     
     def is_configured(self) -> bool:
-        return bool(self.ssid and self.password)
+        return bool(self._ssid and self._password)
+    
+    def clear_secrets(self) -> None:
+        _zeroize(self._ssid)
+        _zeroize(self._password)
 
 
-@dataclass
+@dataclass(slots=True)
 class DeviceNamingConfig:
     prefix: str = "RCC-Device"
     start_number: int = 1
     current_number: int = field(default=1, init=False)
     
     def get_next_name(self) -> str:
-        name = f"{self.prefix}-{self.current_number:03d}"
+        name = "%s-%03d" % (self.prefix, self.current_number)
         self.current_number += 1
         return name
     
@@ -50,7 +120,7 @@ class DeviceNamingConfig:
         self.current_number = self.start_number
 
 
-@dataclass
+@dataclass(slots=True)
 class ProvisioningOptions:
     disable_shelly_ap: bool = True
     disable_shelly_cloud: bool = True
@@ -58,8 +128,10 @@ class ProvisioningOptions:
 
     max_retries: int = 3
     retry_delay_base: float = 2.0
+    max_retry_wait: float = 30.0
     api_timeout: float = 10.0
     wifi_connect_timeout: float = 30.0
+    parallel_devices: int = 2
 
 
 @dataclass
@@ -70,18 +142,7 @@ class LicenseConfig:
 
 
 class SecureConfig:
-    _instance: Optional['SecureConfig'] = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
-    
     def __init__(self):
-        if self._initialized:
-            return
-        
         self._broker = BrokerConfig()
         self._wifi = WiFiConfig()
         self._naming = DeviceNamingConfig()
@@ -89,8 +150,6 @@ class SecureConfig:
         self._license = LicenseConfig()
         
         atexit.register(self.clear_credentials)
-        
-        self._initialized = True
     
     @property
     def broker(self) -> BrokerConfig:
@@ -116,22 +175,21 @@ class SecureConfig:
         return self._broker.is_configured() and self._wifi.is_configured()
     
     def clear_credentials(self) -> None:
-        self._broker.password = ""
-        self._broker.username = ""
-        self._broker.admin_password = ""
-        self._wifi.ssid = ""
-        self._wifi.password = ""
-        gc.collect()
+        self._broker.clear_secrets()
+        self._wifi.clear_secrets()
     
     def get_status_string(self) -> str:
         if not self._broker.ip and not self._broker.hostname:
             return "[notice]Not configured[/notice]"
         
         if self._broker.is_configured():
-            return f"[success]{self._broker.connection_string}[/success] [dim]● Connected[/dim]"
+            return _STATUS_CONNECTED_TPL % self._broker.connection_string
         else:
-            return f"[input]{self._broker.address}[/input] [dim](credentials needed)[/dim]"
+            return _STATUS_PENDING_TPL % self._broker.address
+
+
+_CONFIG: SecureConfig = SecureConfig()
 
 
 def get_config() -> SecureConfig:
-    return SecureConfig()
\ No newline at end of file
+    return _CONFIG
\ No newline at end of file
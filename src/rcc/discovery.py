@@ -1,10 +1,15 @@
+import atexit
+import errno
+import ipaddress
+import selectors
 import socket
 import subprocess
 import platform
 import re
 import time
+import threading
 import concurrent.futures
-from typing import Optional, List, Tuple
+from typing import Any, Dict, Hashable, Optional, List, Tuple
 from dataclasses import dataclass
 
 from .ui import get_console
@@ -15,6 +20,81 @@ except ImportError:
     pass
 
 
+_SYSTEM: str = platform.system().lower()
+_PING_ONCE = ("ping", "-n", "1", "-4") if _SYSTEM == "windows" else ("ping", "-c", "1")
+
+_IPV4_RE = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')
+_UNUSABLE_IP_PREFIXES = ('127.', '0.', '169.254.')
+
+_CONNECT_PENDING = {0, errno.EINPROGRESS, errno.EWOULDBLOCK, getattr(errno, "WSAEWOULDBLOCK", errno.EWOULDBLOCK)}
+_SWEEP_BATCH = 128
+
+_ARP_IP_RE = re.compile(rb'(\d{1,3}(?:\.\d{1,3}){3})')
+# Raspberry Pi OUIs; Windows arp prints them dash-separated.
+_PI_MAC_RE = re.compile(rb'b8[:-]27[:-]eb|dc[:-]a6[:-]32|e4[:-]5f[:-]01|28[:-]cd[:-]c1')
+_NON_HEX = bytes(c for c in range(256) if c not in b"0123456789abcdef")
+
+
+class _TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.ttl:
+                del self._entries[key]
+                return None
+            return entry[1]
+    
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.maxsize:
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic(), value)
+    
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+# Only successes are cached so retry loops still see hosts that come up late.
+_resolved_names = _TTLCache(ttl=30.0)
+_verified_hosts = _TTLCache(ttl=30.0)
+
+
+_zeroconf: Optional["Zeroconf"] = None
+_zeroconf_lock = threading.Lock()
+
+
+def _get_zeroconf() -> "Zeroconf":
+    global _zeroconf
+    with _zeroconf_lock:
+        if _zeroconf is None:
+            _zeroconf = Zeroconf()
+            atexit.register(_zeroconf.close)
+        return _zeroconf
+
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="rcc-discovery")
+            atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+        return _executor
+
+
 @dataclass
 class DiscoveredBroker:
     ip: str
@@ -26,54 +106,54 @@ class DiscoveredBroker:
 class BrokerDiscovery:
     def __init__(self):
         self.console = get_console()
-        self._system = platform.system().lower()
+        self._stop = threading.Event()
     
-    def discover(self, hostname: str = "RCCServer") -> Optional[DiscoveredBroker]:
-        result = self._try_ping_discovery(hostname)
-        if result:
-            return result
+    def discover(self, hostname: str = "RCCServer", timeout: Optional[float] = None) -> Optional[DiscoveredBroker]:
+        # Lower rank wins when several methods finish together.
+        methods = [
+            lambda: self._try_ping_discovery(hostname),
+            lambda: self._try_mdns(hostname),
+            self._try_zeroconf,
+            lambda: self._try_network_scan(hostname),
+        ]
         
-        result = self._try_mdns(hostname)
-        if result:
-            return result
+        self._stop.clear()
+        executor = _get_executor()
+        futures = {executor.submit(method): rank for rank, method in enumerate(methods)}
         
-        result = self._try_zeroconf()
-        if result:
-            return result
-        
-        result = self._try_network_scan(hostname)
-        if result:
-            return result
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=timeout):
+                if future.exception() is None and future.result():
+                    done = [f for f in futures if f.done() and f.exception() is None and f.result()]
+                    return min(done, key=futures.get).result()
+        except concurrent.futures.TimeoutError:
+            pass
+        finally:
+            self._stop.set()
+            for future in futures:
+                future.cancel()
         
         return None
     
-    def _try_ping_discovery(self, hostname: str) -> Optional[DiscoveredBroker]:
+    def _try_ping_discovery(self, hostname: str, timeout: float = 5.0) -> Optional[DiscoveredBroker]:
        
         mdns_name = f"{hostname}.local"
         
         try:
-            if self._system == "windows":
-                cmd = ["ping", "-n", "1", "-4", mdns_name]
-            else:
-                cmd = ["ping", "-c", "1", mdns_name]
-            
             result = subprocess.run(
-                cmd,
+                [*_PING_ONCE, mdns_name],
                 capture_output=True,
                 text=True,
-                timeout=5
+                timeout=timeout
             )
             
             if result.returncode == 0:
-                output = result.stdout
+                match = _IPV4_RE.search(result.stdout)
                 
-                ip_pattern = r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
-                matches = re.findall(ip_pattern, output)
-                
-                if matches:
-                    ip = matches[0]
+                if match:
+                    ip = match.group(0)
                     
-                    if not ip.startswith('127.') and not ip.startswith('0.'):
+                    if not ip.startswith(_UNUSABLE_IP_PREFIXES):
                         return DiscoveredBroker(
                             ip=ip,
                             hostname=hostname,
@@ -90,7 +170,10 @@ class BrokerDiscovery:
         mdns_name = f"{hostname}.local"
         
         try:
-            ip = socket.gethostbyname(mdns_name)
+            ip = _resolved_names.get(mdns_name)
+            if ip is None:
+                ip = socket.gethostbyname(mdns_name)
+                _resolved_names.put(mdns_name, ip)
             return DiscoveredBroker(
                 ip=ip,
                 hostname=hostname,
@@ -106,9 +189,6 @@ class BrokerDiscovery:
             if 'Zeroconf' not in globals():
                 return None
             
-            import threading
-            import threading
-            
             class MQTTListener(ServiceListener):
                 def __init__(self):
                     self.brokers: List[DiscoveredBroker] = []
@@ -133,14 +213,18 @@ class BrokerDiscovery:
                 def update_service(self, zc: Zeroconf, type_: str, name: str) -> None:
                     pass
             
-            zc = Zeroconf()
+            zc = _get_zeroconf()
             listener = MQTTListener()
             
             browser = ServiceBrowser(zc, "_mqtt._tcp.local.", listener)
             
-            listener.event.wait(timeout=5.0)
-            
-            zc.close()
+            try:
+                deadline = time.monotonic() + 5.0
+                while not self._stop.is_set() and time.monotonic() < deadline:
+                    if listener.event.wait(timeout=0.1):
+                        break
+            finally:
+                browser.cancel()
             
             if listener.brokers:
                 return listener.brokers[0]
@@ -159,7 +243,7 @@ class BrokerDiscovery:
         network_prefix = ".".join(local_ip.split(".")[:-1])
         
         result = self._scan_arp_table(hostname)
-        if result:
+        if result or self._stop.is_set():
             return result
         
         result = self._scan_network(network_prefix, hostname)
@@ -175,47 +259,33 @@ class BrokerDiscovery:
         except Exception:
             return None
     
-    def _scan_arp_table(self, hostname: str, mac_address: Optional[str] = None) -> Optional[DiscoveredBroker]:
+    def _scan_arp_table(self, hostname: str, mac_address: Optional[str] = None, timeout: float = 10.0) -> Optional[DiscoveredBroker]:
         try:
-            if self._system == "windows":
-                result = subprocess.run(
-                    ["arp", "-a"],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-            else:
-                result = subprocess.run(
-                    ["arp", "-a"],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
+            result = subprocess.run(
+                ["arp", "-a"],
+                capture_output=True,
+                timeout=timeout
+            )
             
             target_mac = None
             if mac_address:
-                target_mac = mac_address.lower().replace(":", "").replace("-", "")
+                target_mac = mac_address.lower().encode().translate(None, _NON_HEX)
             
-            pi_mac_prefixes = ["b8:27:eb", "dc:a6:32", "e4:5f:01", "28:cd:c1"]
-            
-            for line in result.stdout.lower().split("\n"):
-                clean_line = line.replace("-", ":")
-                
+            for line in result.stdout.lower().splitlines():
                 if target_mac:
-                    line_hex = re.sub(r'[^a-f0-9]', '', line)
-                    if target_mac in line_hex:
-                        ip_match = re.search(r'(\d+\.\d+\.\d+\.\d+)', line)
+                    if target_mac in line.translate(None, _NON_HEX):
+                        ip_match = _ARP_IP_RE.search(line)
                         if ip_match:
                             return DiscoveredBroker(
-                                ip=ip_match.group(1),
+                                ip=ip_match.group(1).decode(),
                                 hostname=hostname,
                                 method="ARP MAC match"
                             )
                 
-                elif any(prefix in clean_line for prefix in pi_mac_prefixes):
-                    ip_match = re.search(r'(\d+\.\d+\.\d+\.\d+)', line)
+                elif _PI_MAC_RE.search(line):
+                    ip_match = _ARP_IP_RE.search(line)
                     if ip_match:
-                        ip = ip_match.group(1)
+                        ip = ip_match.group(1).decode()
                         if self._verify_hostname(ip, hostname):
                             return DiscoveredBroker(
                                 ip=ip,
@@ -227,21 +297,51 @@ class BrokerDiscovery:
         
         return None
     
-    def _ping_host(self, ip: str) -> None:
+    def _sweep_batch(self, ips: List[str], port: int, timeout: float, first_only: bool) -> Optional[str]:
+        selector = selectors.DefaultSelector()
         try:
-            if self._system == "windows":
-                cmd = ["ping", "-n", "1", "-w", "200", ip]
-            else:
-                cmd = ["ping", "-c", "1", "-W", "1", ip]
-                
-            subprocess.run(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                timeout=1
-            )
-        except Exception:
-            pass
+            for ip in ips:
+                try:
+                    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                except OSError:
+                    break
+                try:
+                    sock.setblocking(False)
+                    pending = sock.connect_ex((ip, port)) in _CONNECT_PENDING
+                    if pending:
+                        selector.register(sock, selectors.EVENT_WRITE, ip)
+                except (OSError, ValueError):
+                    pending = False
+                if not pending:
+                    sock.close()
+            
+            deadline = time.monotonic() + timeout
+            while selector.get_map() and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _ in selector.select(remaining):
+                    sock = key.fileobj
+                    selector.unregister(sock)
+                    connected = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0
+                    sock.close()
+                    if connected and first_only:
+                        return key.data
+        finally:
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
+        
+        return None
+
+    def _sweep_subnet(self, network_prefix: str, port: int, timeout: float = 0.5, first_only: bool = True) -> Optional[str]:
+        ips = [f"{network_prefix}.{i}" for i in range(1, 255)]
+        # Batches keep the open socket count under the macOS default fd limit.
+        for start in range(0, len(ips), _SWEEP_BATCH):
+            ip = self._sweep_batch(ips[start:start + _SWEEP_BATCH], port, timeout, first_only)
+            if ip:
+                return ip
+        return None
 
     def _populate_arp_table(self, timeout: float = 2.0) -> None:
         local_ip = self._get_local_ip()
@@ -250,96 +350,201 @@ class BrokerDiscovery:
 
         network_prefix = ".".join(local_ip.split(".")[:-1])
         
-        ips = [f"{network_prefix}.{i}" for i in range(1, 255)]
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
-            executor.map(self._ping_host, ips)
+        # Any connect attempt forces an ARP resolution, open port or not.
+        self._sweep_subnet(network_prefix, 80, timeout=timeout, first_only=False)
 
     def verify_broker_connection(self, ip: str, port: int = 1883) -> bool:
+        if _verified_hosts.get((ip, port)):
+            return True
         try:
             s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             s.settimeout(2.0)
             s.connect((ip, port))
             s.close()
-            return True
         except Exception:
             return False
+        _verified_hosts.put((ip, port), True)
+        return True
     
     def _verify_hostname(self, ip: str, hostname: str) -> bool:
         return self.verify_broker_connection(ip)
 
-    def _scan_network(self, network_prefix: str, hostname: str) -> Optional[DiscoveredBroker]:
-        found_broker = None
+    def _scan_network(self, network_prefix: str, hostname: str, port: int = 1883) -> Optional[DiscoveredBroker]:
+        if self._stop.is_set():
+            return None
         
-        def check_host(ip):
-            nonlocal found_broker
-            if found_broker:
-                return
-            
-            try:
-                if self._system == "windows":
-                    cmd = ["ping", "-n", "1", "-w", "200", ip]
-                else:
-                    cmd = ["ping", "-c", "1", "-W", "1", ip]
-                    
-                result = subprocess.run(
-                    cmd, 
-                    stdout=subprocess.DEVNULL, 
-                    stderr=subprocess.DEVNULL,
-                    timeout=1
-                )
-                
-                if result.returncode == 0:
-                    if self._verify_hostname(ip, hostname):
-                        found_broker = DiscoveredBroker(
-                            ip=ip,
-                            hostname=hostname,
-                            method="Deep Network Scan"
-                        )
-            except Exception:
-                pass
+        ip = self._sweep_subnet(network_prefix, port)
+        if ip:
+            return DiscoveredBroker(
+                ip=ip,
+                hostname=hostname,
+                port=port,
+                method="Deep Network Scan"
+            )
+        return None
 
-        ips = [f"{network_prefix}.{i}" for i in range(1, 255)]
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
-            list(executor.map(check_host, ips))
-            
-        return found_broker
 
+def populate_arp_table(timeout: float = 2.0) -> None:
+    BrokerDiscovery()._populate_arp_table(timeout)
 
-def resolve_hostname(hostname: str, mac_address: Optional[str] = None) -> Optional[str]:
+
+def resolve_hostname(hostname: str, mac_address: Optional[str] = None,
+                     deadline: Optional[float] = None, populate_arp: bool = True) -> Optional[str]:
+    # With a deadline every stage is cut to the time left and skipped once it runs out.
+    def remaining(cap: float) -> float:
+        return cap if deadline is None else min(cap, deadline - time.monotonic())
+    
     discovery = BrokerDiscovery()
     if mac_address:
-        res = discovery._scan_arp_table(hostname, mac_address)
+        res = discovery._scan_arp_table(hostname, mac_address, timeout=remaining(10.0))
         if res:
             return res.ip
         
-        discovery._populate_arp_table()
-        
-        res = discovery._scan_arp_table(hostname, mac_address)
-        if res:
-            return res.ip
+        if populate_arp and remaining(2.0) > 0:
+            # The sweep runs in two batches, each waiting up to the timeout.
+            discovery._populate_arp_table(timeout=remaining(4.0) / 2)
+            
+            res = discovery._scan_arp_table(hostname, mac_address, timeout=remaining(10.0))
+            if res:
+                return res.ip
     
-    res = discovery._try_ping_discovery(hostname)
+    if remaining(5.0) <= 0:
+        return None
+    res = discovery._try_ping_discovery(hostname, timeout=remaining(5.0))
     if res:
         return res.ip
-        
+    
+    if remaining(1.0) <= 0:
+        return None
     res = discovery._try_mdns(hostname)
     if res:
         return res.ip
         
-    if not mac_address:
-        res = discovery._scan_arp_table(hostname)
+    if not mac_address and remaining(10.0) > 0:
+        res = discovery._scan_arp_table(hostname, timeout=remaining(10.0))
         if res:
             return res.ip
     return None
 
 
-def discover_broker(hostname: str = "RCCServer") -> Optional[DiscoveredBroker]:
+def resolve_hostnames_batch(names: List[str], macs: Optional[Dict[str, str]] = None,
+                            total_timeout: float = 3.0) -> Dict[str, str]:
+    # One browse session for every device; records are matched on hostname or MAC as they arrive.
+    wanted = {name.lower(): name for name in names if name}
+    mac_keys = {
+        mac.lower().replace(":", "").replace("-", ""): name
+        for name, mac in (macs or {}).items() if mac and name in names
+    }
+    resolved: Dict[str, str] = {}
+    if not wanted or 'Zeroconf' not in globals():
+        return resolved
+    
+    lock = threading.Lock()
+    done = threading.Event()
+    
+    class _DeviceListener(ServiceListener):
+        def add_service(self, zc: Zeroconf, type_: str, name: str) -> None:
+            info = zc.get_service_info(type_, name)
+            if not info:
+                return
+            addresses = info.parsed_addresses()
+            if not addresses:
+                return
+            
+            label = name.split(".", 1)[0].lower()
+            server = (info.server or "").split(".", 1)[0].lower()
+            match = wanted.get(label) or wanted.get(server)
+            if match is None:
+                match = next((n for key, n in mac_keys.items() if key in label or key in server), None)
+            if match is None:
+                return
+            
+            with lock:
+                resolved.setdefault(match, addresses[0])
+                if len(resolved) == len(wanted):
+                    done.set()
+        
+        def remove_service(self, zc: Zeroconf, type_: str, name: str) -> None:
+            pass
+        
+        def update_service(self, zc: Zeroconf, type_: str, name: str) -> None:
+            pass
+    
+    try:
+        browser = ServiceBrowser(_get_zeroconf(), ["_shelly._tcp.local.", "_http._tcp.local."], _DeviceListener())
+    except Exception:
+        return resolved
+    
+    try:
+        done.wait(total_timeout)
+    finally:
+        browser.cancel()
+    
+    with lock:
+        return dict(resolved)
+
+
+def discover_broker(hostname: str = "RCCServer", timeout: Optional[float] = None) -> Optional[DiscoveredBroker]:
     discovery = BrokerDiscovery()
-    return discovery.discover(hostname)
+    return discovery.discover(hostname, timeout)
 
 
 def verify_broker(ip: str, port: int = 1883) -> bool:
     discovery = BrokerDiscovery()
-    return discovery.verify_broker_connection(ip, port)
\ No newline at end of file
+    return discovery.verify_broker_connection(ip, port)
+
+
+def _as_ipv4(entry: str) -> Optional[str]:
+    try:
+        address = ipaddress.ip_address(entry)
+    except ValueError:
+        return None
+    return str(address) if address.version == 4 else None
+
+
+def _lookup_ipv4(hostname: str) -> Optional[str]:
+    try:
+        infos = socket.getaddrinfo(hostname, None, socket.AF_INET, socket.SOCK_STREAM)
+    except (OSError, UnicodeError):
+        return None
+    return infos[0][4][0] if infos else None
+
+
+def resolve_broker_candidates(entries: List[str], timeout: float = 2.0) -> Tuple[List[str], List[str]]:
+    # Returns (IPv4 addresses to probe, entries that are neither an address nor a resolvable name).
+    addresses: Dict[str, Optional[str]] = {}
+    lookups: Dict[str, concurrent.futures.Future] = {}
+    for entry in dict.fromkeys(e.strip() for e in entries if e and e.strip()):
+        ip = _as_ipv4(entry)
+        # Malformed dotted quads (999.1.1.1) and IPv6 literals are rejected rather than looked up.
+        if ip or _IPV4_RE.fullmatch(entry) or ":" in entry:
+            addresses[entry] = ip
+        else:
+            lookups[entry] = _get_executor().submit(_lookup_ipv4, entry)
+    
+    # Names are looked up together; one that hasn't answered by the deadline counts as bad.
+    if lookups:
+        concurrent.futures.wait(lookups.values(), timeout=timeout)
+    for entry, future in lookups.items():
+        addresses[entry] = future.result() if future.done() else None
+    
+    resolved = list(dict.fromkeys(ip for ip in addresses.values() if ip))
+    rejected = [entry for entry, ip in addresses.items() if not ip]
+    return resolved, rejected
+
+
+def verify_broker_batch(ips: List[str], port: int = 1883, timeout: float = 1.0) -> Optional[str]:
+    # Only literal IPv4 addresses reach the sweep; names go through resolve_broker_candidates first.
+    candidates = list(dict.fromkeys(ip for ip in map(_as_ipv4, ips) if ip))
+    for ip in candidates:
+        if _verified_hosts.get((ip, port)):
+            return ip
+    
+    # All candidates are probed at once through the same non-blocking sweep as the subnet scan.
+    discovery = BrokerDiscovery()
+    for start in range(0, len(candidates), _SWEEP_BATCH):
+        ip = discovery._sweep_batch(candidates[start:start + _SWEEP_BATCH], port, timeout, first_only=True)
+        if ip:
+            _verified_hosts.put((ip, port), True)
+            return ip
+    return None
\ No newline at end of file
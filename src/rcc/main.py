@@ -2,48 +2,162 @@
 
 import sys
 import os
+import atexit
+import queue
 import logging
-from datetime import datetime
-from typing import Optional, List
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import threading
+import time
+from operator import itemgetter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Dict, Optional, List, Tuple
 from .config import get_config, SecureConfig
-from .discovery import discover_broker, verify_broker, DiscoveredBroker
-from .wifi_manager import get_wifi_manager, WiFiNetwork
-from .shelly_api import ShellyAPI
-from .provisioner import create_provisioner, ProvisionedDevice
+from .state import BrokerCache
 from .ui import RCCConsole, print_banner, print_section, print_divider
-from .license_client import LicenseAdminClient
-from .license_decrypt import decrypt_license, DecryptionError
 
+# Action modules pull in zeroconf, requests, paho and cryptography; they are
+# imported inside the menu actions so the main menu renders without them.
+if TYPE_CHECKING:
+    from .discovery import DiscoveredBroker
+    from .wifi_manager import WiFiNetwork
+    from .provisioner import ProvisionedDevice
 
-def setup_logging() -> logging.Logger:
-    log_dir = os.path.expanduser("~/.rcc/logs")
-    os.makedirs(log_dir, exist_ok=True)
-    
-    log_file = os.path.join(
-        log_dir,
-        f"rcc_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-    )
+
+_DISCOVERY_TIMEOUT = 10.0
+_RESOLVE_DEADLINE = 8.0
+
+# (label, config section, attribute, kind, prompt kwargs); int prompts default to the current value.
+_SETUP_PROMPTS = (
+    ("  WiFi Name", "wifi", "ssid", "text", {"default": ""}),
+    ("  WiFi Password", "wifi", "password", "text", {"password": False}),
+    ("  Server port", "broker", "port", "int", {"min_val": 1, "max_val": 65535}),
+    ("  Server Device Password", "broker", "password", "text", {"password": False}),
+    ("  Server RCC-Tool Password", "broker", "admin_password", "text", {"password": False}),
+)
+
+
+def _display_ssid(ssid: str) -> str:
+    if ssid[:6].lower() == "shelly":
+        _, sep, tail = ssid.rpartition("-")
+        if sep and tail:
+            return f"Device - {tail}"
+    return ssid
+
+
+def _dedupe_networks(networks: List["WiFiNetwork"]) -> List["WiFiNetwork"]:
+    # One AP can be reported per band or adapter; keep the strongest sighting.
+    best = {}
+    for n in networks:
+        key = n.mac_address or n.ssid
+        prev = best.get(key)
+        if prev is None or n.signal > prev.signal:
+            best[key] = n
+    return list(best.values())
+
+
+def _mask_ip(ip: Optional[str]) -> str:
+    if ip and ip.count('.') == 3:
+        parts = ip.split('.')
+        return f"***.***.{parts[2]}.{parts[3]}"
+    return ip or "DHCP"
+
+
+class _LazyRotatingFileHandler(RotatingFileHandler):
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+_log_listener: Optional[QueueListener] = None
+
+
+def _spawn(fn, *args, **kwargs) -> Future:
+    # Background work runs on daemon threads: quitting must not wait for a
+    # scan, a discovery or a provisioning batch the UI has already left.
+    future: Future = Future()
     
-    logging.basicConfig(
-        filename=log_file,
-        level=logging.INFO,
-        format='[%(asctime)s] %(levelname)s  %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
     
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def setup_logging() -> logging.Logger:
+    global _log_listener
     logger = logging.getLogger("rcc")
-    logger.info("RCC v1.0.0 started")
+    
+    if not logger.handlers:
+        # Neither the log directory nor the file is touched until the first record is written.
+        file_handler = _LazyRotatingFileHandler(
+            os.path.expanduser("~/.rcc/logs/rcc.log"),
+            maxBytes=2_000_000,
+            backupCount=5,
+            delay=True
+        )
+        file_handler.setFormatter(logging.Formatter(
+            '[%(asctime)s] %(levelname)s  %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        ))
+        
+        # Callers only enqueue records; the listener thread does the disk writes.
+        log_queue = queue.SimpleQueue()
+        _log_listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _log_listener.start()
+        logger.addHandler(QueueHandler(log_queue))
+        logger.setLevel(logging.INFO)
+        atexit.register(stop_logging)
     
     return logger
 
 
+def stop_logging() -> None:
+    global _log_listener
+    if _log_listener is not None:
+        listener, _log_listener = _log_listener, None
+        listener.stop()
+
+
 class RCCApp:
+    __slots__ = (
+        "console", "config", "logger", "provisioner", "_original_wifi",
+        "_saved_broker", "_broker_cache", "_last_scan", "_scan_lock", "_scan_inflight", "_discover_lock", "_stop",
+        "_cleanup_done", "_handlers",
+    )
+    
     def __init__(self):
         self.console = RCCConsole()
         self.config = get_config()
         self.logger = setup_logging()
+        
+        self._saved_broker = BrokerCache.load()
+        if self._saved_broker:
+            self.config.broker.ip = self._saved_broker.ip
+        
         self.provisioner = None
         self._original_wifi: Optional[str] = None
+        self._broker_cache: Dict[str, Tuple["DiscoveredBroker", float]] = {}
+        self._last_scan: Optional[Tuple[List["WiFiNetwork"], List[Tuple[str, str]], float]] = None
+        self._scan_lock = threading.Lock()
+        self._scan_inflight: Optional[Future] = None
+        self._discover_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._cleanup_done = False
+        atexit.register(self._cleanup)
+        self._handlers = {
+            "1": self._discover_broker,
+            "2": self._scan_devices,
+            "3": self._provision_devices,
+            "4": self._reset_devices,
+            "5": self._activate_license,
+            "6": self._migrate_license,
+        }
+        _spawn(self._cached_discover)
     
     def run(self) -> int:
         try:
@@ -51,161 +165,235 @@ class RCCApp:
                 self._setup_configuration()
             
             while True:
+                self.console.flush_input()
                 choice = self.console.show_main_menu(
                     broker_status=self.config.get_status_string()
                 )
                 
-                if choice == "1":
-                    self._discover_broker()
-                elif choice == "2":
-                    self._scan_devices()
-                elif choice == "3":
-                    self._provision_devices()
-                elif choice == "4":
-                    self._reset_devices()
-                elif choice == "5":
-                    self._activate_license()
-                elif choice == "6":
-                    self._migrate_license()
-                elif choice == "Q":
+                if choice == "Q":
                     break
-            
-            self._cleanup()
+                
+                handler = self._handlers.get(choice)
+                if handler:
+                    self._run_action(handler)
             
             self.console.print("\n[dim]Goodbye![/dim]\n")
             return 0
             
         except KeyboardInterrupt:
+            self._stop.set()
+            if self.provisioner:
+                self.provisioner.cancel()
             self.console.print("\n\n[notice]Interrupted by user[/notice]")
-            self._cleanup()
             return 1
         except Exception as e:
             self.logger.exception("Unexpected error")
             self.console.print_error(f"Unexpected error: {str(e)}")
-            self._cleanup()
             return 1
     
+    def _run_action(self, handler) -> None:
+        # A failing action returns to the menu instead of ending the session.
+        try:
+            handler()
+        except Exception as e:
+            self.logger.exception("Action failed")
+            self.console.print_error(f"Unexpected error: {str(e)}")
+            self.console.wait_for_key()
+    
     def _cleanup(self) -> None:
-        self.logger.info("Cleaning up...")
+        if self._cleanup_done:
+            return
+        self._cleanup_done = True
+        self.logger.debug("Cleaning up...")
         self.config.clear_credentials()
-        self.logger.info("Credentials cleared")
+        if self.provisioner:
+            self.provisioner.cancel()
+        self.logger.debug("Credentials cleared")
+        stop_logging()
+    
+    def _cached_discover(self, hostname: str = "RCCServer", ttl: float = 120.0, force: bool = False) -> Optional["DiscoveredBroker"]:
+        from .discovery import discover_broker, verify_broker, DiscoveredBroker
+        
+        with self._discover_lock:
+            # Stale entries are dropped when looked up; there is no sweep.
+            cached = self._broker_cache.pop(hostname, None)
+            if cached and not force and time.monotonic() - cached[1] < ttl:
+                if verify_broker(cached[0].ip, self.config.broker.port):
+                    self._broker_cache[hostname] = cached
+                    return cached[0]
+            
+            # A known address that still answers beats a multi-second discovery,
+            # and stays the fallback when a forced search comes back empty.
+            known_ip = self.config.broker.ip
+            known_alive = bool(known_ip) and verify_broker(known_ip, self.config.broker.port)
+            broker = None
+            # A dead known address is only skipped here, not forgotten: this also runs
+            # before setup has joined the target WiFi. The saved entry is dropped on the
+            # main thread by the SSID check, or replaced once discovery succeeds.
+            if force or not known_alive:
+                broker = discover_broker(hostname, timeout=_DISCOVERY_TIMEOUT)
+            if broker is None and known_alive:
+                broker = DiscoveredBroker(ip=known_ip, hostname=hostname, method="saved")
+            
+            if broker:
+                self._broker_cache[hostname] = (broker, time.monotonic())
+            return broker
+    
+    def _remember_broker(self, ip: str, ssid: str) -> None:
+        # Main thread only, once the target WiFi is known; the entry is keyed on it.
+        if not ssid:
+            return
+        try:
+            self._saved_broker = BrokerCache.save(ip, time.time(), ssid)
+        except OSError:
+            self.logger.warning("Could not save server address")
+    
+    def _clear_saved_broker(self) -> None:
+        self._saved_broker = None
+        try:
+            BrokerCache.clear()
+        except OSError:
+            self.logger.warning("Could not clear saved server address")
+    
+    def _invalidate_broker(self, hostname: str = "RCCServer") -> None:
+        self._broker_cache.pop(hostname, None)
     
     # ═══════════════════════════════════════════════════════════════
     # Configuration Setup - SIMPLIFIED VERSION
     # ═══════════════════════════════════════════════════════════════
     
     def _setup_configuration(self) -> None:
-        self.console.clear()
-        self.console.show_banner()
-        self.console.print("[primary]Target WiFi Configuration[/primary]")
-        print_divider()
+        console = self.console
+        logger = self.logger
+        broker = self.config.broker
+        wifi = self.config.wifi
+        naming = self.config.naming
         
-        ssid = self.console.prompt_text(
-            "  WiFi Name",
-            default=""
-        )
-        self.config.wifi.ssid = ssid
+        console.clear()
+        console.show_banner()
+        console.print("[primary]Target WiFi Configuration[/primary]")
+        print_divider()
         
-        wifi_password = self.console.prompt_text(
-            "  WiFi Password",
-            password=False
-        )
-        self.config.wifi.password = wifi_password
+        discovery = _spawn(self._cached_discover, "RCCServer")
         
-        port = self.console.prompt_int(
-            "  Server port",
-            default=self.config.broker.port,
-            min_val=1,
-            max_val=65535
-        )
-        self.config.broker.port = port
+        for label, section_name, attr, kind, kwargs in _SETUP_PROMPTS:
+            section = getattr(self.config, section_name)
+            if kind == "int":
+                value = console.prompt_int(label, default=getattr(section, attr), **kwargs)
+            else:
+                value = console.prompt_text(label, **kwargs)
+            setattr(section, attr, value)
         
-        device_pw = self.console.prompt_text(
-            "  Server Device Password",
-            password=False
-        )
-        self.config.broker.password = device_pw
+        ssid = wifi.ssid
+        wifi_password = wifi.password
         
-        admin_pw = self.console.prompt_text(
-            "  Server RCC-Tool Password",
-            password=False
-        )
-        self.config.broker.admin_password = admin_pw
+        saved = self._saved_broker
+        if saved and not saved.matches(ssid):
+            # The saved address was found on a different network.
+            with self._discover_lock:
+                self._broker_cache.clear()
+                if broker.ip == saved.ip:
+                    broker.ip = None
+                self._clear_saved_broker()
         
-        self.console.print_info(f"Connecting to {ssid}...")
+        console.print_info(f"Connecting to {ssid}...")
         try:
+            from .wifi_manager import get_wifi_manager
             wifi_manager = get_wifi_manager()
             if wifi_manager.connect(ssid, wifi_password):
-                self.console.print_success(f"Connected to {ssid}")
+                console.print_success(f"Connected to {ssid}")
             else:
-                self.console.print_error(f"Failed to connect to {ssid}")
-                if not self.console.prompt_confirm("Continue anyway?", default=False):
+                console.print_error(f"Failed to connect to {ssid}")
+                if not console.prompt_confirm("Continue anyway?", default=False):
                     return
         except Exception as e:
-            self.console.print_error(f"Connection error: {str(e)}")
-            if not self.console.prompt_confirm("Continue anyway?", default=False):
+            console.print_error(f"Connection error: {str(e)}")
+            if not console.prompt_confirm("Continue anyway?", default=False):
                 return
         
-        self.console.print_info(f"Auto-discovering server...")
+        console.print_info(f"Auto-discovering server...")
         
-        broker = discover_broker("RCCServer")
+        # The prompt-time result is only reused if it still answers on the joined network.
+        discovery.result()
+        found = self._cached_discover("RCCServer")
         
-        if broker:
-            self.console.print_success(f"Found server at {broker.ip}")
-            self.config.broker.ip = broker.ip
-            self.logger.info(f"Auto-discovered server: {broker.ip}")
+        if found:
+            console.print_success(f"Found server at {found.ip}")
+            broker.ip = found.ip
+            self._remember_broker(found.ip, ssid)
+            logger.info(f"Auto-discovered server: {found.ip}")
         else:
-            self.console.print_warning("Could not auto-discover server")
-            self.console.print("[dim]Note: Discovery will retry when needed[/dim]")
+            console.print_warning("Could not auto-discover server")
+            console.print("[dim]Note: Discovery will retry when needed[/dim]")
         
-        self.config.wifi.password = wifi_password
-        
-        self.logger.info(f"Broker: {self.config.broker.address}:{self.config.broker.port}")
-        self.logger.info(f"MQTT User: {self.config.broker.username} (password: ****)")
-        self.logger.info(f"Target WiFi: {self.config.wifi.ssid} (password: ****)")
-        self.logger.info(f"Device prefix: {self.config.naming.prefix}")
+        logger.info(
+            "Config:\n  Broker: %s:%s\n  MQTT User: %s (password: ****)\n"
+            "  Target WiFi: %s (password: ****)\n  Device prefix: %s",
+            broker.address,
+            broker.port,
+            broker.username,
+            wifi.ssid,
+            naming.prefix
+        )
         
-        self.console.wait_for_key()
+        console.wait_for_key()
     
     # ═══════════════════════════════════════════════════════════════
     # Menu Actions
     # ═══════════════════════════════════════════════════════════════
     
     def _discover_broker(self) -> None:
-        self.console.clear()
-        self.console.show_banner()
+        from .discovery import verify_broker, verify_broker_batch, resolve_broker_candidates
+        
+        console = self.console
+        logger = self.logger
+        broker = self.config.broker
+        
+        console.clear()
+        console.show_banner()
         print_section("Discover Server")
         
-        self.console.print_info(f"Searching for server: ...")
+        force = False
+        if "RCCServer" in self._broker_cache:
+            force = console.prompt_confirm("Search again instead of using the last result?", default=False)
+        
+        console.print_info(f"Searching for server: ...")
         
-        broker = discover_broker("RCCServer")
+        found = self._cached_discover("RCCServer", force=force)
         
-        if broker:
-            self.console.print_success(f"Found server at {broker.ip}")
-            self.config.broker.ip = broker.ip
-            self.logger.info(f"Discovered Server: {broker.ip}")
+        if found:
+            console.print_success(f"Found server at {found.ip}")
+            broker.ip = found.ip
+            self._remember_broker(found.ip, self.config.wifi.ssid)
+            logger.info(f"Discovered Server: {found.ip}")
             
-            if verify_broker(broker.ip, self.config.broker.port):
-                self.console.print_success(f"Server is accessible on port {self.config.broker.port}")
+            if verify_broker(found.ip, broker.port):
+                console.print_success(f"Server is accessible on port {broker.port}")
             else:
-                self.console.print_warning(f"Server found but port {self.config.broker.port} not responding")
+                self._invalidate_broker("RCCServer")
+                console.print_warning(f"Server found but port {broker.port} not responding")
         else:
-            self.console.print_error("Could not auto-discover server")
+            console.print_error("Could not auto-discover server")
             
-            ip = self.console.prompt_text(
-                "Enter server IP manually",
-                default=self.config.broker.ip or ""
+            entered = console.prompt_text(
+                "Enter server IP manually (comma-separated to try several)",
+                default=broker.ip or ""
             )
             
-            if ip:
-                if verify_broker(ip, self.config.broker.port):
-                    self.config.broker.ip = ip
-                    self.console.print_success(f"Server verified at {ip}")
-                    self.logger.info(f"Manual broker: {ip}")
+            candidates, rejected = resolve_broker_candidates(entered.split(","))
+            for entry in rejected:
+                console.print_warning(f"Skipping '{entry}': not a valid IP address or hostname")
+            if candidates:
+                ip = verify_broker_batch(candidates, broker.port)
+                if ip:
+                    broker.ip = ip
+                    self._remember_broker(ip, self.config.wifi.ssid)
+                    console.print_success(f"Server verified at {ip}")
+                    logger.info(f"Manual broker: {ip}")
                 else:
-                    self.console.print_error(f"Cannot connect to {ip}:{self.config.broker.port}")
+                    console.print_error(f"Cannot connect to {entered}:{broker.port}")
         
-        self.console.wait_for_key()
+        console.wait_for_key()
     
     def _scan_devices(self) -> None:
         self.console.clear()
@@ -213,30 +401,21 @@ class RCCApp:
         print_section("Scan Devices")
         
         self.console.print()
-        self.console.print_info("Scanning for WiFi networks...")
         
         try:
-            wifi_manager = get_wifi_manager()
-            networks = wifi_manager.scan_shelly_networks()
+            networks = self._wait_with_spinner(
+                _spawn(self._get_networks, force=True),
+                "Scanning for WiFi networks..."
+            )
             
             if networks:
                 self.console.print_success(f"Found {len(networks)} device(s)")
                 self.logger.info(f"Found {len(networks)} devices")
                 
-                devices = []
-                for n in networks:
-                    display_ssid = n.ssid
-                    if n.ssid.lower().startswith("shelly") and "-" in n.ssid:
-                        parts = n.ssid.split("-")
-                        if len(parts) >= 2:
-                            dev_id = parts[-1]
-                            display_ssid = f"Device - {dev_id}"
-                    
-                    devices.append({
-                        "ssid": display_ssid,
-                        "signal": n.signal,
-                        "model": n.shelly_model
-                    })
+                devices = [
+                    {"ssid": label, "signal": n.signal, "model": n.shelly_model}
+                    for n, (label, _) in zip(networks, self._network_items(networks))
+                ]
                 self.console.show_device_table(devices)
             else:
                 self.console.print_warning("No devices found")
@@ -255,239 +434,384 @@ class RCCApp:
         self.console.wait_for_key()
     
     def _provision_devices(self) -> None:
+        from .wifi_manager import get_wifi_manager
+        from .provisioner import create_provisioner
+        from .discovery import populate_arp_table, resolve_hostnames_batch
+        
+        console = self.console
+        logger = self.logger
+        broker = self.config.broker
+        
         if not self.config.is_ready():
-            self.console.print_error("Configuration incomplete. Please set up first.")
-            self.console.wait_for_key()
+            console.print_error("Configuration incomplete. Please set up first.")
+            console.wait_for_key()
             self._setup_configuration()
             return
         
-        if not self.config.broker.ip:
-            self.console.print_warning("Server IP not set. Running discovery...")
+        if not broker.ip:
+            console.print_warning("Server IP not set. Running discovery...")
             self._discover_broker()
-            if not self.config.broker.ip:
+            if not broker.ip:
                 return
         
-        choice = self.console.show_provision_menu()
+        scan = _spawn(self._get_networks)
+        choice = console.show_provision_menu()
         
         if choice == "B":
             return
         
-        self.console.clear()
-        self.console.show_banner()
+        console.clear()
+        console.show_banner()
         print_section("Provision Devices")
-        self.console.print()
-        self.console.print_info("Scanning for devices...")
+        console.print()
         
         try:
             wifi_manager = get_wifi_manager()
-            networks = wifi_manager.scan_shelly_networks()
+            networks = self._wait_with_spinner(scan, "Scanning for devices...")
             
             if not networks:
-                self.console.print_warning("No devices found")
-                self.console.wait_for_key()
+                console.print_warning("No devices found")
+                console.wait_for_key()
                 return
             
-            self.console.print_success(f"Found {len(networks)} device(s)")
+            console.print_success(f"Found {len(networks)} device(s)")
             
-            items = []
-            for n in networks:
-                display_ssid = n.ssid
-                if n.ssid.lower().startswith("shelly") and "-" in n.ssid:
-                    parts = n.ssid.split("-")
-                    if len(parts) >= 2:
-                        dev_id = parts[-1]
-                        display_ssid = f"Device - {dev_id}"
+            while True:
+                items = self._network_items(networks)
                 
-                items.append((display_ssid, f"{n.shelly_model} ({n.signal}dBm)"))
-            
-            if choice == "1":
-                selected = self.console.prompt_selection(
-                    items,
-                    prompt="Select device to provision",
-                    allow_all=False
-                )
-            else:
-                selected = self.console.prompt_selection(
-                    items,
-                    prompt="Select devices (comma-separated) or [A]ll",
-                    allow_all=True
+                if choice == "1":
+                    selected = console.prompt_selection(
+                        items,
+                        prompt="Select device to provision",
+                        allow_all=False,
+                        allow_rescan=True
+                    )
+                else:
+                    selected = console.prompt_selection(
+                        items,
+                        prompt="Select devices (comma-separated) or [A]ll",
+                        allow_all=True,
+                        allow_rescan=True
+                    )
+                
+                if selected is not None:
+                    break
+                
+                networks = self._wait_with_spinner(
+                    _spawn(self._get_networks, force=True),
+                    "Rescanning for devices..."
                 )
+                if not networks:
+                    console.print_warning("No devices found")
+                    console.wait_for_key()
+                    return
+                console.print_success(f"Found {len(networks)} device(s)")
             
             if not selected:
                 return
             
             selected_networks = [networks[i] for i in selected]
-            self.console.print()
-            self.console.print(f"[text]Will provision {len(selected_networks)} device(s)[/text]")
+            console.print()
+            console.print(f"[text]Will provision {len(selected_networks)} device(s)[/text]")
             
-            if not self.console.prompt_confirm("Continue?", default=True):
+            if not console.prompt_confirm("Continue?", default=True):
                 return
             
             self._original_wifi = wifi_manager.get_current_network()
             
             self.provisioner = create_provisioner()
             
-            def on_step(step: str, status: str):
-                self.console.print_step(step, status)
+            resumable = self.provisioner.session
+            if resumable:
+                completed = sum(d.state == "completed" for d in resumable.devices)
+                console.print()
+                console.print_info(
+                    f"Unfinished session {resumable.session_id} from {resumable.started_at}: "
+                    f"{completed} of {len(resumable.devices)} device(s) completed"
+                )
+                if not console.prompt_confirm("Resume it and skip completed devices?", default=True):
+                    self.provisioner.session = None
+            
+            # With several workers the step lines interleave; label each with its device.
+            label_steps = self.config.options.parallel_devices > 1
+            
+            def on_step(step: str, status: str, device: Optional[str] = None):
+                console.print_step(step, status, device if label_steps else None)
+            
+            live_table = console.create_results_table()
             
-            def on_device_complete(device: ProvisionedDevice):
-                if device.state == "completed":
-                    self.console.print_success(f"Device provisioned: {device.assigned_name}")
+            def on_device_complete(device: "ProvisionedDevice"):
+                ok = device.state == "completed"
+                if ok:
+                    console.print_success(f"Device provisioned: {device.assigned_name}")
                 else:
-                    self.console.print_error(f"Device failed: {device.error_message}")
-            
-            self.provisioner.on_step_update = on_step
-            self.provisioner.on_device_complete = on_device_complete
-            
-            def progress_callback(current: int, total: int, network: WiFiNetwork):
-                display_ssid = network.ssid
-                if network.ssid.lower().startswith("shelly") and "-" in network.ssid:
-                    parts = network.ssid.split("-")
-                    if len(parts) >= 2:
-                        dev_id = parts[-1]
-                        display_ssid = f"Device - {dev_id}"
-                
-                self.console.print()
-                self.console.print(
-                    f"[primary][{current}/{total}][/primary] "
-                    f"[text]Provisioning {display_ssid}[/text]"
-                )
+                    console.print_error(f"Device failed: {device.error_message}")
+                console.add_result_row(live_table, {
+                    "mac": device.mac,
+                    "name": device.assigned_name,
+                    "ip": device.final_ip or "DHCP",
+                    "status": "OK" if ok else "FAILED"
+                })
+            
+            def on_batch_aborted(reason: str):
+                console.print_error(f"Stopping batch: {reason}")
+                console.print("[dim]Check the WiFi and Server settings; remaining devices are skipped.[/dim]")
             
-            results = self.provisioner.provision_batch(
+            def on_progress(current: int, total: int, network: "WiFiNetwork"):
+                console.print()
+                console.print_progress_line(current, total, _display_ssid(network.ssid))
+            
+            # Provisioning threads only enqueue; all rendering happens here on the main thread.
+            events: "queue.Queue[tuple]" = queue.Queue()
+            self.provisioner.on_step_update = lambda *args: events.put((on_step, args))
+            self.provisioner.on_device_complete = lambda *args: events.put((on_device_complete, args))
+            self.provisioner.on_batch_aborted = lambda *args: events.put((on_batch_aborted, args))
+            
+            batch = _spawn(
+                self.provisioner.provision_batch,
                 selected_networks,
-                progress_callback=progress_callback
+                progress_callback=lambda *args: events.put((on_progress, args))
             )
             
-            success_count = sum(1 for r in results if r.state == "completed")
-            fail_count = len(results) - success_count
+            with console.show_live(live_table):
+                while True:
+                    try:
+                        pending = [events.get(timeout=1 / 60)]
+                    except queue.Empty:
+                        if batch.done() and events.empty():
+                            break
+                        continue
+                    while True:
+                        try:
+                            pending.append(events.get_nowait())
+                        except queue.Empty:
+                            break
+                    
+                    for i, (render, args) in enumerate(pending):
+                        # An in-progress step that already moved on within this batch is drawn once, in its
+                        # latest state; (step, device) keeps another worker's same-named step from swallowing it.
+                        following = pending[i + 1] if i + 1 < len(pending) else None
+                        if render is on_step and args[1] in ("progress", "retry") and following \
+                                and following[0] is on_step and following[1][0] == args[0] \
+                                and following[1][2:] == args[2:]:
+                            continue
+                        render(*args)
+            
+            results = batch.result()
             
-            summary_devices = [
-                {
+            summary_devices = []
+            success_count = 0
+            for r in results:
+                ok = r.state == "completed"
+                success_count += ok
+                summary_devices.append({
                     "mac": r.mac,
                     "name": r.assigned_name,
                     "ip": r.final_ip or "DHCP",
-                    "status": "OK" if r.state == "completed" else "FAILED"
-                }
-                for r in results
-            ]
+                    "status": "OK" if ok else "FAILED"
+                })
+            fail_count = len(results) - success_count
             
-            self.logger.info(f"Provisioning complete: {success_count} success, {fail_count} failed")
+            logger.info(f"Provisioning complete: {success_count} success, {fail_count} failed in {self.provisioner.session.elapsed:.0f}s")
             
-            #self.console.clear()
-            #self.console.show_banner()
+            #console.clear()
+            #console.show_banner()
             print_section("Provisioning Complete")
             
             if self._original_wifi:
-                self.console.print()
-                self.console.print_info(f"Reconnecting to {self._original_wifi}...")
+                console.print()
+                console.print_info(f"Reconnecting to {self._original_wifi}...")
                 
                 wifi_password = self.config.wifi.password
                 if wifi_manager.connect(self._original_wifi, wifi_password):
-                    self.console.print_success("Reconnected to original network")
+                    console.print_success("Reconnected to original network")
                     
-                    from .discovery import resolve_hostname
-                    import time
+                    completed = [d for d in results if d.state == "completed"]
+                    resolved = resolve_hostnames_batch(
+                        [d.assigned_name for d in completed],
+                        {d.assigned_name: d.mac for d in completed}
+                    )
+                    for device in completed:
+                        found_ip = resolved.get(device.assigned_name)
+                        if found_ip:
+                            device.final_ip = found_ip
+                            logger.info(f"Resolved IP for {device.assigned_name}: {found_ip}")
                     
-                    for device in results:
-                        if device.state == "completed":
-                            found_ip = None
-                            for i in range(5):
-                                found_ip = resolve_hostname(device.assigned_name, device.mac)
+                    # Anything mDNS did not answer for falls back to the ARP/ping resolver.
+                    completed = [d for d in completed if not d.final_ip]
+                    if completed:
+                        deadline = time.monotonic() + _RESOLVE_DEADLINE
+                        # One subnet sweep fills the ARP cache for every device; the
+                        # workers only read it, keeping open sockets within _SWEEP_BATCH.
+                        populate_arp_table(timeout=1.0)
+                        executor = ThreadPoolExecutor(max_workers=min(8, len(completed)))
+                        try:
+                            futures = {executor.submit(self._resolve_device_ip, d, deadline): d for d in completed}
+                            for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic()) + 0.5):
+                                device, found_ip = futures[future], future.result()
                                 if found_ip:
-                                    break
-                                time.sleep(2)
-                            
-                            if found_ip:
-                                device.final_ip = found_ip
-                                self.logger.info(f"Resolved IP for {device.assigned_name}: {found_ip}")
+                                    device.final_ip = found_ip
+                                    logger.info(f"Resolved IP for {device.assigned_name}: {found_ip}")
+                        except FutureTimeoutError:
+                            logger.info("Address lookup deadline reached; remaining devices left unresolved")
+                        finally:
+                            executor.shutdown(wait=False, cancel_futures=True)
                 else:
-                    self.console.print_error("Failed to reconnect to original network")
+                    console.print_error("Failed to reconnect to original network")
             
-            self.console.print()
-            updated_summary = []
-            for r in results:
-                ip_addr = r.final_ip or "DHCP"
-                formatted_ip = ip_addr
-                if ip_addr and ip_addr != "DHCP" and ip_addr.count('.') == 3:
-                    parts = ip_addr.split('.')
-                    formatted_ip = f"***.***.{parts[2]}.{parts[3]}"
-                
-                updated_summary.append({
-                    "mac": r.mac,
-                    "name": r.assigned_name,
-                    "ip": formatted_ip,
-                    "status": "OK" if r.state == "completed" else "FAILED"
-                })
+            console.print()
+            for row, r in zip(summary_devices, results):
+                row["ip"] = _mask_ip(r.final_ip)
             
-            self.console.show_summary(success_count, fail_count, updated_summary, ip_col_name="Address")
+            # The provisioned APs are gone now; rescan while the summary is on screen
+            # so the next Scan/Provision starts from a fresh, already-cached list.
+            self._last_scan = None
+            _spawn(self._get_networks, force=True)
+            
+            console.show_summary(success_count, fail_count, summary_devices, ip_col_name="Address")
             
         except NotImplementedError as e:
-            self.console.print_error(str(e))
+            console.print_error(str(e))
         except Exception as e:
-            self.console.print_error(f"Provisioning failed: {str(e)}")
-            self.logger.exception("Provisioning failed")
+            console.print_error(f"Provisioning failed: {str(e)}")
+            logger.exception("Provisioning failed")
         
-        self.console.wait_for_key()
+        console.wait_for_key()
+    
+    def _wait_with_spinner(self, future: Future, label: str):
+        # Short result() timeouts keep Ctrl-C responsive while the worker blocks.
+        with self.console.status(label):
+            while True:
+                try:
+                    return future.result(timeout=0.1)
+                except FutureTimeoutError:
+                    continue
+    
+    def _get_networks(self, max_age: float = 25.0, force: bool = False) -> List["WiFiNetwork"]:
+        from .wifi_manager import get_wifi_manager
+        
+        with self._scan_lock:
+            cached = self._last_scan
+            if cached and not force and time.monotonic() - cached[2] < max_age:
+                return cached[0]
+            # Only one OS scan at a time; a caller arriving mid-scan waits for that result.
+            inflight = self._scan_inflight
+            owner = inflight is None
+            if owner:
+                inflight = self._scan_inflight = Future()
+        
+        if not owner:
+            return inflight.result()
+        
+        try:
+            networks = _dedupe_networks(get_wifi_manager().scan_shelly_networks())
+            # Empty scans are not kept so the next attempt always looks again.
+            self._last_scan = (networks, self._format_networks(networks), time.monotonic()) if networks else None
+            inflight.set_result(networks)
+            return networks
+        except BaseException as e:
+            inflight.set_exception(e)
+            raise
+        finally:
+            with self._scan_lock:
+                self._scan_inflight = None
+    
+    def _format_networks(self, networks: List["WiFiNetwork"]) -> List[Tuple[str, str]]:
+        return [(_display_ssid(n.ssid), f"{n.shelly_model} ({n.signal}dBm)") for n in networks]
+    
+    def _network_items(self, networks: List["WiFiNetwork"]) -> List[Tuple[str, str]]:
+        # Selection rows are built once per scan and shared by Scan and Provision.
+        cached = self._last_scan
+        if cached and cached[0] is networks:
+            return cached[1]
+        return self._format_networks(networks)
+    
+    def _resolve_device_ip(self, device: "ProvisionedDevice", deadline: float) -> Optional[str]:
+        from .discovery import resolve_hostname
+        
+        delay = 0.2
+        while True:
+            found_ip = resolve_hostname(device.assigned_name, device.mac, deadline=deadline, populate_arp=False)
+            remaining = deadline - time.monotonic()
+            if found_ip or remaining <= 0 or self._stop.wait(min(delay, remaining)):
+                return found_ip
+            delay = min(delay * 2, 1.6)
     
     def _reset_devices(self) -> None:
-        choice = self.console.show_reset_menu()
+        from .discovery import verify_broker
+        
+        console = self.console
+        logger = self.logger
+        broker = self.config.broker
+        
+        choice = console.show_reset_menu()
         
         if choice == "B":
             return
         
-        self.console.clear()
-        self.console.show_banner()
+        console.clear()
+        console.show_banner()
         print_section("Reset Device")
-        self.console.print()
-        self.console.print_info("Scanning for online devices...")
+        console.print()
+        console.print_info("Scanning for online devices...")
         
         try:
             from .mqtt_client import MQTTVerifier
             
-            if not self.config.broker.ip:
-                self.console.print_warning("Server IP not configured")
-                self.console.wait_for_key()
+            if not broker.ip:
+                console.print_warning("Server IP not configured")
+                console.wait_for_key()
                 return
             
             verifier = MQTTVerifier(
-                self.config.broker.ip,
-                self.config.broker.port,
-                self.config.broker.username,
-                self.config.broker.password
+                broker.ip,
+                broker.port,
+                broker.username,
+                broker.password
             )
             
-            found_devices = verifier.verify(timeout=10)
+            # Listen while the port probe runs so early announcements are not missed.
+            probe = _spawn(verify_broker, broker.ip, broker.port)
+            listen = _spawn(verifier.verify, 10, idle=1.5)
+            
+            if not probe.result():
+                self._invalidate_broker("RCCServer")
+                verifier.stop()
+                listen.result()
+                console.print_error(f"Cannot connect to {broker.ip}:{broker.port}")
+                console.wait_for_key()
+                return
+            
+            found_devices = listen.result()
             
             if not found_devices:
-                self.console.print_warning("No online devices found")
-                self.console.print("[dim]Note: Devices might take a moment to connect and announce.[/dim]")
-                self.console.wait_for_key()
+                console.print_warning("No online devices found")
+                console.print("[dim]Note: Devices might take a moment to connect and announce.[/dim]")
+                console.wait_for_key()
                 return
             
             found_devices = [d for d in found_devices if d.get("id", "").startswith("RCC-Device")]
             
             if not found_devices:
-                self.console.print_warning("No RCC provisioned devices found")
-                self.console.print("[dim]Only devices with 'RCC-Device' prefix are shown.[/dim]")
-                self.console.wait_for_key()
+                console.print_warning("No RCC provisioned devices found")
+                console.print("[dim]Only devices with 'RCC-Device' prefix are shown.[/dim]")
+                console.wait_for_key()
                 return
             
-            found_devices.sort(key=lambda x: x.get("id", ""))
-            self.console.print_success(f"Found {len(found_devices)} RCC device(s)")
+            # The prefix filter above guarantees every remaining entry has an id.
+            found_devices.sort(key=itemgetter("id"))
+            console.print_success(f"Found {len(found_devices)} RCC device(s)")
             
-            items = []
-            for device in found_devices:
-                dev_id = device.get("id", "Unknown")
-                items.append((dev_id, ""))
+            items = [(device["id"], "") for device in found_devices]
             
             if choice == "1":
-                selected = self.console.prompt_selection(
+                selected = console.prompt_selection(
                     items,
                     prompt="Select device to reset",
                     allow_all=False
                 )
             else:
-                selected = self.console.prompt_selection(
+                selected = console.prompt_selection(
                     items,
                     prompt="Select devices (comma-separated) or [A]ll",
                     allow_all=True
@@ -498,58 +822,66 @@ class RCCApp:
             
             selected_devices = [found_devices[i] for i in selected]
             
-            self.console.print()
+            console.print()
             if len(selected_devices) == 1:
                 warning_msg = "This action will reset the device you selected and disconnect it from the Server. You will need to provision it again."
             else:
                 warning_msg = f"This action will reset {len(selected_devices)} devices and disconnect them from the Server. You will need to provision them again."
             
-            self.console.print_warning(warning_msg)
+            console.print_warning(warning_msg)
             
-            if not self.console.prompt_confirm("Are you sure?", default=False):
-                self.console.print_info("Reset cancelled")
-                self.console.wait_for_key()
+            if not console.prompt_confirm("Are you sure?", default=False):
+                console.print_info("Reset cancelled")
+                console.wait_for_key()
                 return
             
-            self.console.print()
+            console.print()
             success_count = 0
             fail_count = 0
             
             for device in selected_devices:
-                dev_id = device.get("id", "Unknown")
-                ip = device.get("ip", None)
-                
-                if not ip:
-                    self.console.print_error(f"{dev_id}: No IP address")
-                    fail_count += 1
-                    continue
-                
-                self.console.print_info(f"Resetting {dev_id}...")
-                
-                try:
-                    api = ShellyAPI(ip, timeout=10.0)
-                    api.factory_reset()
-                    self.console.print_success(f"{dev_id}: Reset command sent")
-                    success_count += 1
-                except Exception as e:
-                    if "Connection" in str(e) or "Timeout" in str(e):
-                        self.console.print_success(f"{dev_id}: Reset command sent (device disconnected)")
+                console.print_info(f"Resetting {device['id']}...")
+            
+            with ThreadPoolExecutor(max_workers=min(16, len(selected_devices))) as executor:
+                futures = [executor.submit(self._reset_one, device) for device in selected_devices]
+                for future in as_completed(futures):
+                    dev_id, ok, msg = future.result()
+                    if ok:
+                        console.print_success(f"{dev_id}: {msg}")
                         success_count += 1
                     else:
-                        self.console.print_error(f"{dev_id}: Failed - {str(e)}")
+                        console.print_error(f"{dev_id}: {msg}")
                         fail_count += 1
             
-            self.console.print()
+            console.print()
             if success_count > 0:
-                self.console.print_success(f"Reset success devices: {success_count}")
+                console.print_success(f"Reset success devices: {success_count}")
             if fail_count > 0:
-                self.console.print_error(f"Reset failed devices: {fail_count}")
+                console.print_error(f"Reset failed devices: {fail_count}")
             
         except Exception as e:
-            self.console.print_error(f"Reset failed: {str(e)}")
-            self.logger.exception("Reset failed")
+            console.print_error(f"Reset failed: {str(e)}")
+            logger.exception("Reset failed")
         
-        self.console.wait_for_key()
+        console.wait_for_key()
+
+    def _reset_one(self, device: dict) -> Tuple[str, bool, str]:
+        from .shelly_api import ShellyAPI
+        
+        dev_id = device["id"]
+        ip = device.get("ip", None)
+        
+        if not ip:
+            return dev_id, False, "No IP address"
+        
+        try:
+            ShellyAPI(ip, timeout=10.0).factory_reset()
+            return dev_id, True, "Reset command sent"
+        except Exception as e:
+            # The device drops off the network as soon as the reset starts.
+            if "Connection" in str(e) or "Timeout" in str(e):
+                return dev_id, True, "Reset command sent (device disconnected)"
+            return dev_id, False, f"Failed - {str(e)}"
 
     # ═══════════════════════════════════════════════════════════════
     # License Management
@@ -557,6 +889,8 @@ class RCCApp:
 
     def _activate_license(self) -> None:
         """Activate license on the Pi by sending a license key."""
+        from .license_client import LicenseAdminClient
+        
         self.console.clear()
         self.console.show_banner()
         print_section("Activate License")
@@ -605,6 +939,9 @@ class RCCApp:
 
     def _migrate_license(self) -> None:
         """Migrate license to new hardware using Transfer Token."""
+        from .license_client import LicenseAdminClient
+        from .license_decrypt import decrypt_license, DecryptionError
+        
         self.console.clear()
         self.console.show_banner()
         print_section("Migrate License (Transfer Token)")
@@ -720,6 +1057,10 @@ class RCCApp:
 
 
 def main() -> int:
+    # Keep prompts visible when stdout is piped (e.g. through tee).
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(line_buffering=True)
+    
     app = RCCApp()
     return app.run()
 
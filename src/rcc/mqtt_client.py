@@ -1,12 +1,23 @@
 import json
 import re
+import threading
 import time
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 import paho.mqtt.client as mqtt
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
+# Both parsers take the raw bytes payload; orjson.JSONDecodeError subclasses
+# json.JSONDecodeError, so the existing except clauses cover either one.
+_loads = orjson.loads if HAS_ORJSON else json.loads
+
 # ── Shared Shelly Topic Patterns ──────────────────────────────
 # Gen1 devices publish to: shellies/<model>-<mac>/<subtopic>
 # Gen2 devices publish to: <model>-<mac>/<subtopic>
@@ -32,10 +43,14 @@ class MQTTVerifier:
         self.username = username
         self.password = password
         self.found_devices: List[Dict] = []
+        self._by_mac: Dict[str, Dict] = {}
+        self._by_id: Dict[str, Dict] = {}
         self._connected = False
+        self._stop = threading.Event()
+        self._last_new_device = time.monotonic()
 
         client_id = f"rcc-verifier-{int(time.time())}"
-        self.client = mqtt.Client(client_id=client_id, protocol=mqtt.MQTTv311)
+        self.client = mqtt.Client(client_id=client_id, protocol=mqtt.MQTTv5)
 
         if self.username and self.password:
             self.client.username_pw_set(self.username, self.password)
@@ -43,7 +58,7 @@ class MQTTVerifier:
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
 
-    def _on_connect(self, client, userdata, flags, rc):
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
         if rc == 0:
             self._connected = True
             logger.info("Connected to MQTT broker")
@@ -52,16 +67,19 @@ class MQTTVerifier:
             # Same wildcard 'shelly#' as rcc-engine's mqtt_mediator — must stay in sync.
             client.subscribe("shelly#", 0)
 
-            # Gen1 devices (legacy): publish under shellies/<model>-<mac>/...
-            client.subscribe("shellies/#", 0)
-
-            # Supplementary Gen2 discovery topics
-            client.subscribe("+/online", 0)
-            client.subscribe("+/announce", 0)
-            client.subscribe("+/events/rpc", 0)
-            client.subscribe("+/status/wifi", 0)
-            # Response topic for our outgoing WiFi.GetStatus RPC calls
-            client.subscribe("rcc-verifier/rpc", 0)
+            # Gen1 devices (legacy) only need their online flags here; their
+            # announce replies arrive on shellies/announce, covered by +/announce.
+            # The rest of shellies/# is telemetry we never read.
+            # Supplementary Gen2 discovery topics and the response topic for our
+            # outgoing WiFi.GetStatus RPC calls go in the same round trip.
+            client.subscribe([
+                ("shellies/+/online", 0),
+                ("+/events/rpc", 0),
+                ("+/online", 0),
+                ("+/announce", 0),
+                ("+/status/wifi", 0),
+                ("rcc-verifier/rpc", 0),
+            ])
 
             # Trigger Gen1 device announcements
             client.publish("shellies/command", "announce")
@@ -70,10 +88,15 @@ class MQTTVerifier:
 
     def _on_message(self, client, userdata, msg):
         try:
-            payload = msg.payload.decode("utf-8")
+            raw = msg.payload
             topic = msg.topic
 
-            logger.debug(f"Received message on {topic}: {payload}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Received message on {topic}: {raw!r}")
+
+            # Retained or last-will "false" means the device is gone, not found.
+            if topic.endswith("/online") and raw.strip() == b"false":
+                return
 
             # ── Gen2: <model>-<mac>/<subtopic> ───────────────────────────
             gen2_match = SHELLY_GEN2_PATTERN.match(topic)
@@ -92,7 +115,7 @@ class MQTTVerifier:
                 # Extract IP from wifi status sub-topic
                 if sub_topic == "status/wifi":
                     try:
-                        data = json.loads(payload)
+                        data = _loads(raw)
                         ip = data.get("sta_ip")
                         if ip:
                             self._update_device_ip(device_id, ip)
@@ -113,9 +136,30 @@ class MQTTVerifier:
                 return
 
             # ── Supplementary discovery topics ────────────────────────────
-            if topic.endswith("/announce"):
+            if topic.endswith("/events/rpc"):
+                prefix = topic.split("/")[0]
+                try:
+                    data = _loads(raw)
+                    src = data.get("src", "")
+                    mac = "Unknown"
+                    if "-" in src:
+                        parts = src.split("-")
+                        if len(parts) >= 2:
+                            possible_mac = parts[-1].upper()
+                            if len(possible_mac) == 12:
+                                mac = possible_mac
+
+                    self._add_device({
+                        "id": prefix, "ip": "Check DHCP",
+                        "model": "Gen2 Device", "mac": mac,
+                        "status": "online (rpc)",
+                    })
+                except json.JSONDecodeError:
+                    pass
+
+            elif topic.endswith("/announce"):
                 try:
-                    data = json.loads(payload)
+                    data = _loads(raw)
                     device_name = data.get("name") or data.get("id")
                     normalized = {
                         "id":          device_name,
@@ -143,34 +187,13 @@ class MQTTVerifier:
                 self._add_device({
                     "id": prefix, "ip": "Check DHCP",
                     "model": "Device", "mac": "Unknown",
-                    "status": payload,
+                    "status": raw.decode("utf-8"),
                 })
 
-            elif topic.endswith("/events/rpc"):
-                prefix = topic.split("/")[0]
-                try:
-                    data = json.loads(payload)
-                    src = data.get("src", "")
-                    mac = "Unknown"
-                    if "-" in src:
-                        parts = src.split("-")
-                        if len(parts) >= 2:
-                            possible_mac = parts[-1].upper()
-                            if len(possible_mac) == 12:
-                                mac = possible_mac
-
-                    self._add_device({
-                        "id": prefix, "ip": "Check DHCP",
-                        "model": "Gen2 Device", "mac": mac,
-                        "status": "online (rpc)",
-                    })
-                except json.JSONDecodeError:
-                    pass
-
             elif topic.endswith("/status/wifi"):
                 prefix = topic.split("/")[0]
                 try:
-                    data = json.loads(payload)
+                    data = _loads(raw)
                     ip = data.get("sta_ip")
                     if ip:
                         self._update_device_ip(prefix, ip)
@@ -179,12 +202,13 @@ class MQTTVerifier:
 
             elif topic == "rcc-verifier/rpc":
                 try:
-                    data = json.loads(payload)
+                    data = _loads(raw)
                     result = data.get("result", {})
                     ip  = result.get("sta_ip")
                     src = data.get("src", "")
 
-                    logger.debug(f"RPC response: src={src}, ip={ip}, devices={len(self.found_devices)}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"RPC response: src={src}, ip={ip}, devices={len(self.found_devices)}")
 
                     if ip and src:
                         src_mac = ""
@@ -213,11 +237,10 @@ class MQTTVerifier:
 
     def _update_device_ip(self, device_id: str, ip: str) -> None:
         """Update the IP address of a known device by id."""
-        for device in self.found_devices:
-            if device.get("id") == device_id:
-                device["ip"] = ip
-                logger.info(f"Updated IP {ip} for device {device_id}")
-                return
+        device = self._by_id.get(device_id)
+        if device is not None:
+            device["ip"] = ip
+            logger.info(f"Updated IP {ip} for device {device_id}")
 
     def _add_device(self, data: Dict):
         device_id = data.get("id")
@@ -225,38 +248,44 @@ class MQTTVerifier:
             return
 
         new_mac = data.get("mac")
+        has_mac = bool(new_mac) and new_mac != "Unknown"
+
+        device = self._by_mac.get(new_mac) if has_mac else None
+        if device is None:
+            device = self._by_id.get(device_id)
+
+        if device is None:
+            self._last_new_device = time.monotonic()
+            self.found_devices.append(data)
+            self._by_id[device_id] = data
+            if has_mac:
+                self._by_mac[new_mac] = data
+            return
 
-        for device in self.found_devices:
-            existing_mac = device.get("mac")
-            existing_id  = device.get("id")
-
-            mac_match = (new_mac and existing_mac and
-                         new_mac != "Unknown" and existing_mac != "Unknown" and
-                         new_mac == existing_mac)
-            id_match = (device_id == existing_id)
-
-            if mac_match or id_match:
-                # Prefer descriptive name over placeholder
-                if not device_id.startswith("RCC-Device"):
-                    device["id"] = device_id
-
-                if data.get("ip") and data.get("ip") != "Check DHCP":
-                    device["ip"] = data["ip"]
-
-                if data.get("model") and data.get("model") not in ("Device", "Gen2 Device"):
-                    device["model"] = data["model"]
+        # Prefer descriptive name over placeholder
+        if not device_id.startswith("RCC-Device") and device["id"] != device_id:
+            if self._by_id.get(device["id"]) is device:
+                del self._by_id[device["id"]]
+            device["id"] = device_id
+            self._by_id[device_id] = device
 
-                if new_mac and new_mac != "Unknown":
-                    device["mac"] = new_mac
+        if data.get("ip") and data.get("ip") != "Check DHCP":
+            device["ip"] = data["ip"]
 
-                return
+        if data.get("model") and data.get("model") not in ("Device", "Gen2 Device"):
+            device["model"] = data["model"]
 
-        self.found_devices.append(data)
+        if has_mac and device.get("mac") != new_mac:
+            old_mac = device.get("mac")
+            if old_mac and self._by_mac.get(old_mac) is device:
+                del self._by_mac[old_mac]
+            device["mac"] = new_mac
+            self._by_mac[new_mac] = device
 
-    def verify(self, timeout: int = 5) -> List[Dict]:
+    def verify(self, timeout: int = 5, idle: Optional[float] = None) -> List[Dict]:
         try:
             logger.info(f"Connecting to {self.broker_ip}:{self.port}...")
-            self.client.connect(self.broker_ip, self.port, 60)
+            self.client.connect(self.broker_ip, self.port, 60, clean_start=True)
             self.client.loop_start()
 
             start_time = time.time()
@@ -264,11 +293,17 @@ class MQTTVerifier:
                 if time.time() - start_time > 5:
                     logger.error("Connection timeout")
                     break
-                time.sleep(0.1)
+                if self._stop.wait(0.1):
+                    break
 
             if self._connected:
                 logger.info(f"Listening for devices for {timeout} seconds...")
-                time.sleep(timeout)
+                deadline = time.monotonic() + timeout
+                while not self._stop.wait(0.1) and time.monotonic() < deadline:
+                    # Stop once announcements have settled instead of sitting out the full window.
+                    if idle is not None and self.found_devices \
+                            and time.monotonic() - self._last_new_device > idle:
+                        break
 
         except Exception as e:
             logger.error(f"MQTT Error: {e}")
@@ -277,3 +312,7 @@ class MQTTVerifier:
             self.client.disconnect()
 
         return self.found_devices
+
+    def stop(self) -> None:
+        """Cut a running verify() short; it returns what it has found so far."""
+        self._stop.set()
@@ -1,17 +1,51 @@
 import time
+import glob
 import json
+from functools import partial
+import logging
 import os
-from datetime import datetime
-from typing import List, Optional, Tuple, Callable
-from dataclasses import dataclass, field, asdict
+import queue
+import random
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple, Type, Callable
+from dataclasses import dataclass, field, asdict, is_dataclass
 from enum import Enum
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 from .config import SecureConfig, get_config
 from .wifi_manager import get_wifi_manager, WiFiNetwork, WiFiManagerBase
 from .shelly_api import ShellyAPI, ShellyDeviceInfo, ShellyAPIError, SHELLY_AP_IP
 from .discovery import verify_broker
 from .ui import get_console
 
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = os.path.expanduser("~/.rcc/checkpoints")
+
+
+def _dump_line(record) -> bytes:
+    # orjson serializes dataclasses itself, skipping the recursive asdict() copy.
+    if HAS_ORJSON:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    if is_dataclass(record):
+        record = asdict(record)
+    return (json.dumps(record) + "\n").encode()
+
+
+_loads = orjson.loads if HAS_ORJSON else json.loads
+
+
+def _now_iso() -> str:
+    # Same local ISO-8601 stamp as datetime.now().isoformat(), to the second.
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
 
 class ProvisionState(Enum):
     PENDING = "pending"
@@ -28,15 +62,21 @@ class ProvisionState(Enum):
     ROLLED_BACK = "rolled_back"
 
 
-@dataclass
-class ProvisionStep:
-    name: str
-    state: str = "pending"
-    error_message: Optional[str] = None
-    retry_count: int = 0
+# Plain-string state values, resolved once instead of through the enum on every assignment.
+_S_PENDING = ProvisionState.PENDING.value
+_S_CONNECTING = ProvisionState.CONNECTING.value
+_S_GET_INFO = ProvisionState.GET_INFO.value
+_S_CONFIG_MQTT = ProvisionState.CONFIG_MQTT.value
+_S_CONFIG_WIFI = ProvisionState.CONFIG_WIFI.value
+_S_DISABLE_AP = ProvisionState.DISABLE_AP.value
+_S_DISABLE_CLOUD = ProvisionState.DISABLE_CLOUD.value
+_S_RENAME = ProvisionState.RENAME.value
+_S_COMPLETED = ProvisionState.COMPLETED.value
+_S_FAILED = ProvisionState.FAILED.value
+_S_ROLLED_BACK = ProvisionState.ROLLED_BACK.value
 
 
-@dataclass
+@dataclass(slots=True)
 class ProvisionedDevice:
     mac: str
     ap_ssid: str
@@ -46,7 +86,8 @@ class ProvisionedDevice:
     final_ip: Optional[str] = None
     steps_completed: List[str] = field(default_factory=list)
     error_message: Optional[str] = None
-    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    ready_after: Optional[float] = None
+    timestamp: str = field(default_factory=_now_iso)
 
 
 @dataclass
@@ -55,36 +96,92 @@ class ProvisionSession:
     broker_host: str
     broker_port: int
     devices: List[ProvisionedDevice] = field(default_factory=list)
-    started_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    started_at: str = field(default_factory=_now_iso)
     completed_at: Optional[str] = None
+    # Serialized checkpoint line per device, built once when the device is added.
+    _lines: List[bytes] = field(default_factory=list, init=False, repr=False, compare=False)
+    _started_monotonic: float = field(default_factory=time.monotonic, init=False, repr=False, compare=False)
+    checkpoint_path: str = field(default="", init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        self.checkpoint_path = os.path.join(CHECKPOINT_DIR, f"rcc_checkpoint_{self.session_id}.jsonl")
+        devices, self.devices = self.devices, []
+        for d in devices:
+            self.add_device(d)
+    
+    def add_device(self, device: ProvisionedDevice) -> bytes:
+        line = _dump_line(device)
+        self.devices.append(device)
+        self._lines.append(line)
+        return line
+    
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started_monotonic
     
-    def save_checkpoint(self, filepath: str) -> None:
-        data = {
+    # Checkpoints are JSON Lines: a session header, one line per finished
+    # device, and a closing line carrying completed_at.
+    def save_checkpoint(self, filepath: Optional[str] = None) -> None:
+        filepath = filepath or self.checkpoint_path
+        header = {
             "session_id": self.session_id,
             "broker_host": self.broker_host,
             "broker_port": self.broker_port,
             "started_at": self.started_at,
-            "completed_at": self.completed_at,
-            "devices": [asdict(d) for d in self.devices]
         }
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+        # A resumed batch rewrites the very file it was loaded from; replace it atomically.
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_dump_line(header))
+            f.write(b"".join(self._lines))
+            if self.completed_at:
+                f.write(_dump_line({"completed_at": self.completed_at}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    
+    def append_device(self, device: ProvisionedDevice, filepath: Optional[str] = None) -> None:
+        self._append_line(filepath or self.checkpoint_path, self.add_device(device))
+    
+    def completion_line(self) -> bytes:
+        return _dump_line({"completed_at": self.completed_at})
+    
+    def finish_checkpoint(self, filepath: Optional[str] = None) -> None:
+        self._append_line(filepath or self.checkpoint_path, self.completion_line())
+    
+    @staticmethod
+    def _append_line(filepath: str, line: bytes) -> None:
+        with open(filepath, 'ab') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    @staticmethod
+    def _iter_checkpoint(filepath: str) -> Iterator[dict]:
+        with open(filepath, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield _loads(line)
     
     @classmethod
     def load_checkpoint(cls, filepath: str) -> 'ProvisionSession':
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        records = cls._iter_checkpoint(filepath)
+        header = next(records)
         
         session = cls(
-            session_id=data["session_id"],
-            broker_host=data["broker_host"],
-            broker_port=data["broker_port"],
+            session_id=header["session_id"],
+            broker_host=header["broker_host"],
+            broker_port=header["broker_port"],
         )
-        session.started_at = data["started_at"]
-        session.completed_at = data.get("completed_at")
-        session.devices = [
-            ProvisionedDevice(**d) for d in data.get("devices", [])
-        ]
+        session.started_at = header["started_at"]
+        session.checkpoint_path = filepath
+        
+        for record in records:
+            if "completed_at" in record and "ap_ssid" not in record:
+                session.completed_at = record["completed_at"]
+            else:
+                session.add_device(ProvisionedDevice(**record))
         return session
 
 
@@ -92,33 +189,84 @@ class RetryError(Exception):
     pass
 
 
+class ProvisionCancelled(Exception):
+    pass
+
+
+# requests' exceptions derive from OSError, as do ConnectionError and TimeoutError.
+_RETRYABLE_ERRORS = (ShellyAPIError, OSError)
+
+
+MAX_IDENTICAL_FAILURES = 3
+
+
+def _wait_until_ready(host: str, port: int = 80, timeout: float = 5.0, interval: float = 0.1) -> Optional[float]:
+    # Returns seconds until the port accepted a connection, or None if it never did.
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=0.25):
+                return time.monotonic() - start
+        except OSError:
+            pass
+        if time.monotonic() + interval >= deadline:
+            return None
+        time.sleep(interval)
+
+
 def retry_operation(
     operation: Callable,
     max_retries: int = 3,
     delay_base: float = 2.0,
-    backoff: str = "exponential",
-    on_retry: Optional[Callable[[int, Exception], None]] = None
+    backoff: str = "decorrelated",
+    on_retry: Optional[Callable[[int, Exception], None]] = None,
+    max_delay: float = 30.0,
+    max_total_wait: Optional[float] = None,
+    retry_on: Tuple[Type[BaseException], ...] = _RETRYABLE_ERRORS,
+    cancel_event: Optional[threading.Event] = None
 ):
     last_error = None
+    previous_delay = delay_base
+    waited = 0.0
+    attempts = 0
+    # The operation always runs at least once.
+    max_retries = max(1, max_retries)
     
     for attempt in range(max_retries):
+        attempts += 1
         try:
             return operation()
-        except Exception as e:
+        except retry_on as e:
             last_error = e
             
+            # A definite answer from the device (bad SSID, invalid params) won't change on retry.
+            if isinstance(e, ShellyAPIError) and not e.transient:
+                break
+            
             if attempt < max_retries - 1:
-                if on_retry:
-                    on_retry(attempt + 1, e)
-                
-                if backoff == "exponential":
-                    delay = delay_base * (2 ** attempt)
+                if backoff == "decorrelated":
+                    # Jittered so parallel workers retrying the same step don't wake in lockstep.
+                    delay = min(max_delay, random.uniform(delay_base, previous_delay * 3))
+                    previous_delay = delay
                 else:
                     delay = delay_base
                 
-                time.sleep(delay)
+                if max_total_wait is not None:
+                    delay = min(delay, max_total_wait - waited)
+                    if delay <= 0:
+                        break
+                
+                if on_retry:
+                    on_retry(attempt + 1, e)
+                
+                if cancel_event is None:
+                    time.sleep(delay)
+                elif cancel_event.wait(delay):
+                    raise ProvisionCancelled()
+                waited += delay
     
-    raise RetryError(f"Operation failed after {max_retries} attempts: {last_error}")
+    raise RetryError(f"Operation failed after {attempts} attempt{'s' if attempts != 1 else ''}: {last_error}")
 
 
 class Provisioner:
@@ -127,8 +275,18 @@ class Provisioner:
         self.console = get_console()
         self.wifi_manager: Optional[WiFiManagerBase] = None
         self.session: Optional[ProvisionSession] = None
-        self.on_step_update: Optional[Callable[[str, str], None]] = None
+        # Called as (step, status, device_name); workers run concurrently, so the name tells their lines apart.
+        self.on_step_update: Optional[Callable[[str, str, Optional[str]], None]] = None
         self.on_device_complete: Optional[Callable[[ProvisionedDevice], None]] = None
+        self.on_batch_aborted: Optional[Callable[[str], None]] = None
+        self._radio_lock = threading.Lock()
+        self._worker = threading.local()
+        self._cancel = threading.Event()
+        self._session_lock = threading.Lock()
+        self._checkpoint_queue: "queue.Queue[Optional[Tuple[str, bytes]]]" = queue.Queue()
+        self._abort_reason: Optional[str] = None
+        self._consecutive_failures = 0
+        self._last_failure: Optional[Tuple[Optional[str], Optional[str]]] = None
     
     def initialize(self) -> bool:
         try:
@@ -138,188 +296,245 @@ class Provisioner:
             self.console.print(f"[notice]{str(e)}[/notice]")
             return False
     
+    def cancel(self) -> None:
+        # Running devices stop at their next step or wait; queued ones are skipped.
+        self._cancel.set()
+    
+    def _check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise ProvisionCancelled()
+    
     def _update_step(self, step: str, status: str) -> None:
         if self.on_step_update:
-            self.on_step_update(step, status)
+            self.on_step_update(step, status, getattr(self._worker, "device_name", None))
+    
+    def _retry_step(
+        self,
+        label: str,
+        operation: Callable,
+        max_retries: Optional[int] = None,
+        delay_base: Optional[float] = None,
+        backoff: str = "decorrelated"
+    ):
+        options = self.config.options
+        
+        def on_retry(n: int, e: Exception) -> None:
+            self._update_step(f"{label} (retry {n})", "retry")
+        
+        return retry_operation(
+            operation,
+            max_retries=options.max_retries if max_retries is None else max_retries,
+            delay_base=options.retry_delay_base if delay_base is None else delay_base,
+            backoff=backoff,
+            on_retry=on_retry,
+            max_total_wait=options.max_retry_wait,
+            cancel_event=self._cancel
+        )
     
     def provision_device(
         self,
         network: WiFiNetwork,
-        device_name: Optional[str] = None
+        device_name: Optional[str] = None,
+        on_start: Optional[Callable[[], None]] = None
     ) -> ProvisionedDevice:
         if not device_name:
             device_name = self.config.naming.get_next_name()
+        self._worker.device_name = device_name
         
         device = ProvisionedDevice(
             mac=network.mac_address or "unknown",
             ap_ssid=network.ssid,
             model=network.shelly_model,
-            state=ProvisionState.PENDING.value,
+            state=_S_PENDING,
             assigned_name=device_name
         )
         
+        api = ShellyAPI(SHELLY_AP_IP, timeout=self.config.options.api_timeout)
+        
         try:
-            self._update_step("Connecting to AP...", "progress")
-            device.state = ProvisionState.CONNECTING.value
-            
-            success = retry_operation(
-                lambda: self.wifi_manager.connect_to_shelly(network.ssid),
-                max_retries=self.config.options.max_retries,
-                delay_base=5.0,
-                backoff="linear",
-                on_retry=lambda n, e: self._update_step(f"Connecting to AP... (retry {n})", "retry")
-            )
-            
-            if not success:
-                raise Exception("Failed to connect to AP")
-            
-            self._update_step("Connecting to AP...", "success")
-            device.steps_completed.append("connect_ap")
-            
-            time.sleep(3)
-            
-            self._update_step("Getting device info...", "progress")
-            device.state = ProvisionState.GET_INFO.value
-            
-            api = ShellyAPI(SHELLY_AP_IP, timeout=self.config.options.api_timeout)
-            
-            device_info = retry_operation(
-                lambda: api.get_device_info(),
-                max_retries=self.config.options.max_retries,
-                delay_base=self.config.options.retry_delay_base,
-                on_retry=lambda n, e: self._update_step(f"Getting device info... (retry {n})", "retry")
-            )
-            
-            device.mac = device_info.mac
-            device.model = device_info.friendly_name
-            
-            self._update_step("Getting device info...", "success")
-            device.steps_completed.append("get_info")
-            
-            self._update_step("Configuring Server...", "progress")
-            device.state = ProvisionState.CONFIG_MQTT.value
-            
-            retry_operation(
-                lambda: api.configure_mqtt(
-                    server=self.config.broker.address,
-                    port=self.config.broker.port,
-                    username=self.config.broker.username,
-                    password=self.config.broker.password,
-                    topic_prefix=device_name
-                ),
-                max_retries=self.config.options.max_retries,
-                delay_base=self.config.options.retry_delay_base,
-                on_retry=lambda n, e: self._update_step(f"Configuring Server... (retry {n})", "retry")
-            )
-            
-            self._update_step("Configuring Server...", "success")
-            device.steps_completed.append("config_mqtt")
-            
-            self._update_step("Configuring WiFi...", "progress")
-            device.state = ProvisionState.CONFIG_WIFI.value
-            
-            retry_operation(
-                lambda: api.configure_wifi(
-                    ssid=self.config.wifi.ssid,
-                    password=self.config.wifi.password,
-                    enable_ap=True
-                ),
-                max_retries=self.config.options.max_retries,
-                delay_base=self.config.options.retry_delay_base,
-                on_retry=lambda n, e: self._update_step(f"Configuring WiFi... (retry {n})", "retry")
-            )
-            
-            self._update_step("Configuring WiFi...", "success")
-            device.steps_completed.append("config_wifi")
-            
-            if self.config.options.disable_shelly_cloud:
-                self._update_step("Disabling cloud...", "progress")
-                device.state = ProvisionState.DISABLE_CLOUD.value
-                
+            # Only one AP association at a time; the post-reboot wait runs without the radio.
+            with self._radio_lock:
+                self._check_cancelled()
+                # Announced only once this worker owns the radio, so headers follow the real order.
+                if on_start:
+                    on_start()
                 try:
-                    api.disable_cloud()
-                    self._update_step("Disabling cloud...", "success")
-                    device.steps_completed.append("disable_cloud")
-                except Exception:
-                    self._update_step("Disabling cloud...", "success")
-            
-            self._update_step(f"Renaming to {device_name}...", "progress")
-            device.state = ProvisionState.RENAME.value
-            
-            try:
-                api.set_device_name(device_name)
-                api.set_discoverable(False)
-                self._update_step(f"Renaming to {device_name}...", "success")
-                device.steps_completed.append("rename")
-            except Exception:
-                self._update_step(f"Renaming to {device_name}...", "success")
-
-            self._update_step("Rebooting device...", "progress")
-            
-            try:
-                api.reboot()
-                self._update_step("Reboot successfully", "success")
-            except Exception as e:
-                if "Timeout" in str(e) or "Connection aborted" in str(e):
-                    self._update_step("Rebooting...", "success")
-                else:
-                     self._update_step(f"Reboot warning: {str(e)}", "success")
-            
-            device.steps_completed.append("reboot")
+                    self._configure_over_ap(network, device, device_name, api)
+                except RetryError as e:
+                    device.state = _S_FAILED
+                    device.error_message = str(e)
+                    self._update_step("Failed", "error")
+                    # Still joined to this device's AP; once the lock is released
+                    # another worker may associate with a different device.
+                    self._rollback_device(api, device)
+                    raise
             
             self._update_step("Waiting for device to restart...", "progress")
             
-            time.sleep(10)
+            if self._cancel.wait(10):
+                raise ProvisionCancelled()
             
-            self._update_step("Reconnecting to device to disable AP...", "progress")
-            try:
-                success = retry_operation(
-                    lambda: self.wifi_manager.connect_to_shelly(network.ssid),
-                    max_retries=5,
-                    delay_base=5.0,
-                    backoff="linear",
-                    on_retry=lambda n, e: self._update_step(f"Reconnecting... (retry {n})", "retry")
-                )
-                
-                if success:
-                     self._update_step("Reconnected successfully", "success")
-                     
-                     self._update_step("Disabling AP mode...", "progress")
-                     device.state = ProvisionState.DISABLE_AP.value
-                     
-                     try:
-                         api.disable_ap()
-                     except Exception as e:
-                         pass
-                         
-                     self._update_step("AP mode disabled", "success")
-                     device.steps_completed.append("disable_ap")
-                     
-                else:
-                     self._update_step("Could not reconnect to disable AP", "warning")
-                     
-            except Exception as e:
-                self._update_step(f"Error disabling AP: {str(e)}", "warning")
-
+            with self._radio_lock:
+                self._check_cancelled()
+                self._disable_ap_after_reboot(network, device, api)
             
-            device.state = ProvisionState.COMPLETED.value
+            device.state = _S_COMPLETED
             
-        except RetryError as e:
-            device.state = ProvisionState.FAILED.value
-            device.error_message = str(e)
-            self._update_step("Failed", "error")
-            self._rollback_device(api if 'api' in dir() else None, device)
+        except RetryError:
+            pass
+        
+        except ProvisionCancelled:
+            device.state = _S_FAILED
+            device.error_message = "Cancelled"
             
         except Exception as e:
-            device.state = ProvisionState.FAILED.value
+            if not isinstance(e, _RETRYABLE_ERRORS):
+                logger.exception(f"Unexpected error provisioning {network.ssid}")
+            device.state = _S_FAILED
             device.error_message = str(e)
             self._update_step(f"Error: {str(e)}", "error")
         
+        finally:
+            api.close()
+        
         if self.on_device_complete:
             self.on_device_complete(device)
         
         return device
     
+    def _configure_over_ap(
+        self,
+        network: WiFiNetwork,
+        device: ProvisionedDevice,
+        device_name: str,
+        api: ShellyAPI
+    ) -> None:
+        self._update_step("Connecting to AP...", "progress")
+        device.state = _S_CONNECTING
+        
+        success = self._retry_step(
+            "Connecting to AP...",
+            partial(self.wifi_manager.connect_to_shelly, network.ssid),
+            delay_base=5.0,
+            backoff="linear"
+        )
+        
+        if not success:
+            raise ConnectionError("Failed to connect to AP")
+        
+        self._update_step("Connecting to AP...", "success")
+        device.steps_completed.append("connect_ap")
+        
+        # A slow device that misses the window is still covered by the get_info retries.
+        device.ready_after = _wait_until_ready(SHELLY_AP_IP)
+        
+        self._update_step("Getting device info...", "progress")
+        device.state = _S_GET_INFO
+        
+        device_info = self._retry_step("Getting device info...", api.get_device_info)
+        
+        device.mac = device_info.mac
+        device.model = device_info.friendly_name
+        
+        self._update_step("Getting device info...", "success")
+        device.steps_completed.append("get_info")
+        
+        self._update_step("Configuring Server...", "progress")
+        device.state = _S_CONFIG_MQTT
+        
+        self._retry_step("Configuring Server...", partial(
+            api.configure_mqtt,
+            server=self.config.broker.address,
+            port=self.config.broker.port,
+            username=self.config.broker.username,
+            password=self.config.broker.password,
+            topic_prefix=device_name
+        ))
+        
+        self._update_step("Configuring Server...", "success")
+        device.steps_completed.append("config_mqtt")
+        
+        self._update_step("Configuring WiFi...", "progress")
+        device.state = _S_CONFIG_WIFI
+        
+        self._retry_step("Configuring WiFi...", partial(
+            api.configure_wifi,
+            ssid=self.config.wifi.ssid,
+            password=self.config.wifi.password,
+            enable_ap=True
+        ))
+        
+        self._update_step("Configuring WiFi...", "success")
+        device.steps_completed.append("config_wifi")
+        
+        if self.config.options.disable_shelly_cloud:
+            self._update_step("Disabling cloud...", "progress")
+            device.state = _S_DISABLE_CLOUD
+            
+            try:
+                api.disable_cloud()
+                device.steps_completed.append("disable_cloud")
+            except _RETRYABLE_ERRORS:
+                pass
+            self._update_step("Disabling cloud...", "success")
+        
+        self._update_step(f"Renaming to {device_name}...", "progress")
+        device.state = _S_RENAME
+        
+        try:
+            api.configure_device(device_name, discoverable=False)
+            device.steps_completed.append("rename")
+        except _RETRYABLE_ERRORS:
+            pass
+        self._update_step(f"Renaming to {device_name}...", "success")
+
+        self._update_step("Rebooting device...", "progress")
+        
+        try:
+            api.reboot()
+            self._update_step("Reboot successfully", "success")
+        except ShellyAPIError as e:
+            # The device often drops the connection before answering a reboot.
+            if e.transient:
+                self._update_step("Rebooting...", "success")
+            else:
+                 self._update_step(f"Reboot warning: {str(e)}", "success")
+        
+        device.steps_completed.append("reboot")
+    
+    def _disable_ap_after_reboot(self, network: WiFiNetwork, device: ProvisionedDevice, api: ShellyAPI) -> None:
+        self._update_step("Reconnecting to device to disable AP...", "progress")
+        try:
+            success = self._retry_step(
+                "Reconnecting...",
+                partial(self.wifi_manager.connect_to_shelly, network.ssid),
+                max_retries=5,
+                delay_base=5.0,
+                backoff="linear"
+            )
+            
+            if success:
+                 self._update_step("Reconnected successfully", "success")
+                 
+                 self._update_step("Disabling AP mode...", "progress")
+                 device.state = _S_DISABLE_AP
+                 api.drop_connections()
+                 _wait_until_ready(SHELLY_AP_IP)
+                 
+                 try:
+                     api.disable_ap()
+                 except ShellyAPIError:
+                     pass
+                     
+                 self._update_step("AP mode disabled", "success")
+                 device.steps_completed.append("disable_ap")
+                 
+            else:
+                 self._update_step("Could not reconnect to disable AP", "warning")
+                 
+        except (RetryError, *_RETRYABLE_ERRORS) as e:
+            self._update_step(f"Error disabling AP: {str(e)}", "warning")
+    
     def _rollback_device(self, api: Optional[ShellyAPI], device: ProvisionedDevice) -> None:
         try:
             if api and "config_mqtt" in device.steps_completed:
@@ -328,42 +543,134 @@ class Provisioner:
                     enable=False
                 )
             
-            device.state = ProvisionState.ROLLED_BACK.value
-        except Exception:
+            device.state = _S_ROLLED_BACK
+        except _RETRYABLE_ERRORS:
             pass
     
+    def _checkpoint_worker(self) -> None:
+        # Single writer, so lines land in the order the workers queued them.
+        while True:
+            item = self._checkpoint_queue.get()
+            if item is None:
+                return
+            filepath, line = item
+            try:
+                ProvisionSession._append_line(filepath, line)
+            except OSError as e:
+                logger.warning(f"Checkpoint write failed: {e}")
+    
+    def _record_outcome(self, device: ProvisionedDevice) -> None:
+        # Identical failures in a row point at bad settings (e.g. the target WiFi
+        # password), not at the devices; stop before burning retries on the rest.
+        if device.state == _S_COMPLETED:
+            self._consecutive_failures = 0
+            self._last_failure = None
+            return
+        
+        failure = (device.steps_completed[-1] if device.steps_completed else None, device.error_message)
+        if failure == self._last_failure:
+            self._consecutive_failures += 1
+        else:
+            self._last_failure = failure
+            self._consecutive_failures = 1
+        
+        if self._consecutive_failures >= MAX_IDENTICAL_FAILURES and self._abort_reason is None:
+            self._abort_reason = f"{self._consecutive_failures} devices failed the same way: {device.error_message}"
+            if self.on_batch_aborted:
+                self.on_batch_aborted(self._abort_reason)
+    
+    def _continue_numbering(self, session: ProvisionSession) -> None:
+        # The name doubles as the MQTT topic prefix, so a resumed run must not
+        # hand out a number the interrupted run already used.
+        naming = self.config.naming
+        stem = f"{naming.prefix}-"
+        used = [
+            int(d.assigned_name[len(stem):])
+            for d in session.devices
+            if d.assigned_name and d.assigned_name.startswith(stem) and d.assigned_name[len(stem):].isdigit()
+        ]
+        if used:
+            naming.current_number = max(naming.current_number, max(used) + 1)
+    
     def provision_batch(
         self,
         networks: List[WiFiNetwork],
         progress_callback: Optional[Callable[[int, int, WiFiNetwork], None]] = None
     ) -> List[ProvisionedDevice]:
-        self.session = ProvisionSession(
-            session_id=datetime.now().strftime("%Y%m%d_%H%M%S"),
-            broker_host=self.config.broker.address,
-            broker_port=self.config.broker.port
-        )
+        # An unfinished session left by a crash is continued; devices it already
+        # completed are matched by AP SSID or MAC and not provisioned again.
+        done: Dict[str, ProvisionedDevice] = {}
+        if self.session is not None and self.session.completed_at is None:
+            for d in self.session.devices:
+                if d.state == _S_COMPLETED:
+                    done[d.ap_ssid] = d
+                    done[d.mac] = d
+            done.pop("unknown", None)
+        else:
+            self.session = ProvisionSession(
+                session_id=time.strftime("%Y%m%d_%H%M%S"),
+                broker_host=self.config.broker.address,
+                broker_port=self.config.broker.port
+            )
+        
+        previous = [done.get(n.ssid) or done.get(n.mac_address or "") for n in networks]
+        if done:
+            self._continue_numbering(self.session)
+            logger.info(f"Resuming session {self.session.session_id}: {sum(p is not None for p in previous)} of {len(networks)} devices already provisioned")
         
         original_network = self.wifi_manager.get_current_network()
         
-        results: List[ProvisionedDevice] = []
+        checkpoint_path = self.session.checkpoint_path
+        self.session.save_checkpoint()
+        # Names are taken up front so numbering follows selection order, not finish order.
+        names = {i: self.config.naming.get_next_name() for i, prev in enumerate(previous) if prev is None}
         
-        for i, network in enumerate(networks):
-            if progress_callback:
-                progress_callback(i + 1, len(networks), network)
-            
-            device = self.provision_device(network)
-            results.append(device)
-            
-            self.session.devices.append(device)
-            
-            checkpoint_path = f"rcc_checkpoint_{self.session.session_id}.json"
-            self.session.save_checkpoint(checkpoint_path)
-            
-            if i < len(networks) - 1:
-                time.sleep(2)
+        writer = threading.Thread(target=self._checkpoint_worker, name="rcc-checkpoint", daemon=True)
+        writer.start()
         
-        self.session.completed_at = datetime.now().isoformat()
-        self.session.save_checkpoint(f"rcc_checkpoint_{self.session.session_id}.json")
+        self._abort_reason = None
+        self._consecutive_failures = 0
+        self._last_failure = None
+        
+        def run(i: int, network: WiFiNetwork) -> ProvisionedDevice:
+            skipped = self._abort_reason is not None or self._cancel.is_set()
+            if skipped:
+                device = ProvisionedDevice(
+                    mac=network.mac_address or "unknown",
+                    ap_ssid=network.ssid,
+                    model=network.shelly_model,
+                    state=_S_FAILED,
+                    assigned_name=names[i],
+                    error_message="Skipped: cancelled" if self._cancel.is_set() else "Skipped: batch aborted"
+                )
+                if self.on_device_complete:
+                    self.on_device_complete(device)
+            else:
+                on_start = partial(progress_callback, i + 1, len(networks), network) if progress_callback else None
+                device = self.provision_device(network, names[i], on_start=on_start)
+            
+            with self._session_lock:
+                self._checkpoint_queue.put((checkpoint_path, self.session.add_device(device)))
+                if not skipped:
+                    self._record_outcome(device)
+            
+            return device
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.config.options.parallel_devices)) as pool:
+                futures = {i: pool.submit(run, i, network) for i, network in enumerate(networks) if i in names}
+                results: List[ProvisionedDevice] = [
+                    prev if prev is not None else futures[i].result()
+                    for i, prev in enumerate(previous)
+                ]
+            
+            # A cancelled batch stays open so the next run can resume it.
+            if not self._cancel.is_set():
+                self.session.completed_at = _now_iso()
+                self._checkpoint_queue.put((checkpoint_path, self.session.completion_line()))
+        finally:
+            self._checkpoint_queue.put(None)
+            writer.join()
         
         if original_network:
             self.console.print(f"\n[info]Reconnecting to {original_network}...[/info]")
@@ -377,7 +684,25 @@ class Provisioner:
         )
 
 
+def _find_resumable_session(broker_host: str) -> Optional[ProvisionSession]:
+    paths = sorted(glob.glob(os.path.join(CHECKPOINT_DIR, "rcc_checkpoint_*.jsonl")), key=os.path.getmtime, reverse=True)
+    for path in paths:
+        try:
+            session = ProvisionSession.load_checkpoint(path)
+        except (OSError, ValueError, KeyError, TypeError, StopIteration) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+            continue
+        if session.completed_at is None and session.broker_host == broker_host:
+            return session
+        # Only the newest checkpoint can belong to an interrupted run.
+        return None
+    return None
+
+
 def create_provisioner() -> Provisioner:
     provisioner = Provisioner()
     provisioner.initialize()
+    provisioner.session = _find_resumable_session(provisioner.config.broker.address)
+    if provisioner.session:
+        logger.info(f"Found unfinished session {provisioner.session.session_id} in {provisioner.session.checkpoint_path}")
     return provisioner
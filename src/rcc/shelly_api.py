@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
@@ -6,6 +7,19 @@ from dataclasses import dataclass
 SHELLY_AP_IP = "192.168.33.1"
 SHELLY_AP_GATEWAY = "192.168.33.1"
 
+# RPC error codes for a busy or briefly unavailable device; worth retrying.
+TRANSIENT_ERROR_CODES = (-114, -503)
+
+
+def _new_session(pool_size: int = 32) -> requests.Session:
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0))
+    return session
+
+
+# Keep-alive connections to devices on the LAN are shared across ShellyAPI instances.
+_session = _new_session()
+
 
 @dataclass
 class ShellyDeviceInfo:
@@ -27,13 +41,23 @@ class ShellyAPIError(Exception):
         self.message = message
         self.code = code
         super().__init__(f"API Error: {message}" + (f" (code: {code})" if code else ""))
+    
+    @property
+    def transient(self) -> bool:
+        # Transport failures may clear up on their own; most RPC error codes are the device's answer.
+        return self.code is None or self.code in TRANSIENT_ERROR_CODES
 
 
 class ShellyAPI:
-    def __init__(self, ip: str = SHELLY_AP_IP, timeout: float = 10.0):
+    def __init__(self, ip: str = SHELLY_AP_IP, timeout: float = 10.0, session: Optional[requests.Session] = None):
         self.ip = ip
         self.base_url = f"http://{ip}"
         self.timeout = timeout
+        # Every device answers on the same AP address, so a pooled connection
+        # from the previous device's network must not be reused there.
+        if session is None:
+            session = _new_session(pool_size=1) if ip == SHELLY_AP_IP else _session
+        self.session = session
         self._request_id = 0
     
     def _get_request_id(self) -> int:
@@ -45,10 +69,21 @@ class ShellyAPI:
         
         try:
             if params:
-                response = requests.post(url, json=params, timeout=self.timeout)
+                response = self.session.post(url, json=params, timeout=self.timeout)
             else:
-                response = requests.get(url, timeout=self.timeout)
+                response = self.session.get(url, timeout=self.timeout)
             
+            if response.status_code >= 400:
+                # Gen2 reports RPC failures as an HTTP error with {"code", "message"} in the body.
+                try:
+                    error = response.json()
+                except ValueError:
+                    error = None
+                if isinstance(error, dict) and "code" in error:
+                    raise ShellyAPIError(
+                        message=error.get("message", "Unknown error"),
+                        code=error["code"]
+                    )
             response.raise_for_status()
             data = response.json()
             
@@ -70,7 +105,7 @@ class ShellyAPI:
     
     def get_device_info(self) -> ShellyDeviceInfo:
         try:
-            response = requests.get(f"{self.base_url}/shelly", timeout=self.timeout)
+            response = self.session.get(f"{self.base_url}/shelly", timeout=self.timeout)
             response.raise_for_status()
             data = response.json()
             
@@ -83,7 +118,7 @@ class ShellyAPI:
                 ver=data.get("ver", "unknown"),
                 app=data.get("app", "unknown"),
             )
-        except Exception as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
             raise ShellyAPIError(f"Failed to get device info: {str(e)}")
     
     def get_status(self) -> Dict[str, Any]:
@@ -192,6 +227,19 @@ class ShellyAPI:
         result = self._rpc_call("Sys.SetConfig", config)
         return True
     
+    def configure_device(self, name: str, discoverable: bool = False) -> bool:
+        config = {
+            "config": {
+                "device": {
+                    "name": name,
+                    "discoverable": discoverable
+                }
+            }
+        }
+        
+        self._rpc_call("Sys.SetConfig", config)
+        return True
+    
     def set_discoverable(self, discoverable: bool = False) -> bool:
         config = {
             "config": {
@@ -207,6 +255,14 @@ class ShellyAPI:
     def reboot(self) -> None:
         self._rpc_call("Shelly.Reboot")
     
+    def drop_connections(self) -> None:
+        # Pooled sockets do not survive a device reboot or a WiFi reassociation.
+        self.session.close()
+    
+    def close(self) -> None:
+        if self.session is not _session:
+            self.session.close()
+    
     def factory_reset(self) -> bool:
         try:
             self._rpc_call("Shelly.FactoryReset")
@@ -239,5 +295,5 @@ def check_shelly_ap_mode() -> bool:
         api = ShellyAPI(SHELLY_AP_IP, timeout=5.0)
         api.get_device_info()
         return True
-    except Exception:
+    except ShellyAPIError:
         return False
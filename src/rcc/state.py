@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+_STATE_PATH = os.path.expanduser("~/.rcc/state.json")
+_STATE_MAX_AGE = 86400
+
+
+def _ssid_hash(ssid: str) -> str:
+    # The SSID is handled like a credential elsewhere, so only a digest goes to disk.
+    return hashlib.sha256(ssid.encode()).hexdigest()[:16] if ssid else ""
+
+
+@dataclass(slots=True)
+class BrokerCache:
+    ip: str
+    ts: float
+    ssid_hash: str = ""
+
+    def matches(self, ssid: str) -> bool:
+        # Entries written before the WiFi name was known match any network.
+        return not self.ssid_hash or not ssid or self.ssid_hash == _ssid_hash(ssid)
+
+    @classmethod
+    def load(cls, max_age: float = _STATE_MAX_AGE) -> Optional["BrokerCache"]:
+        try:
+            with open(_STATE_PATH, "r") as f:
+                data = json.load(f)
+            cached = cls(
+                ip=data["ip"],
+                ts=float(data["ts"]),
+                ssid_hash=data.get("ssid_hash", ""),
+            )
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+        if not cached.ip or time.time() - cached.ts >= max_age:
+            return None
+        return cached
+
+    @classmethod
+    def save(cls, ip: str, ts: float, ssid: str = "") -> "BrokerCache":
+        cached = cls(ip=ip, ts=ts, ssid_hash=_ssid_hash(ssid))
+        os.makedirs(os.path.dirname(_STATE_PATH), exist_ok=True)
+        tmp_path = _STATE_PATH + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"ip": cached.ip, "ts": cached.ts, "ssid_hash": cached.ssid_hash}, f)
+        os.replace(tmp_path, _STATE_PATH)
+        return cached
+
+    @staticmethod
+    def clear() -> None:
+        try:
+            os.remove(_STATE_PATH)
+        except FileNotFoundError:
+            pass
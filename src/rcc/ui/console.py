@@ -8,18 +8,36 @@ from rich.prompt import Prompt, Confirm
 from rich.panel import Panel
 from rich.live import Live
 from rich.layout import Layout
+from rich.text import Text
+from rich.markup import escape
 from .theme import get_console, RCC_THEME, COLORS
 from .ascii_art import print_banner, print_divider, print_section, DIVIDER
 
 
 class RCCConsole:
+    __slots__ = ("console", "_style_primary", "_style_text")
+    
     def __init__(self):
         self.console = get_console()
+        self._style_primary = self.console.get_style("primary")
+        self._style_text = self.console.get_style("text")
     
     def clear(self) -> None:
         import os
         os.system('cls' if os.name == 'nt' else 'clear')
     
+    def flush_input(self) -> None:
+        # Drop keys typed during long-running actions so they can't pick a menu option.
+        if not sys.stdin.isatty():
+            return
+        try:
+            import msvcrt
+            while msvcrt.kbhit():
+                msvcrt.getwch()
+        except ImportError:
+            import termios
+            termios.tcflush(sys.stdin, termios.TCIFLUSH)
+    
     def print(self, text: str = "", style: str = "text") -> None:
         self.console.print(text, style=style)
     
@@ -35,7 +53,7 @@ class RCCConsole:
     def print_warning(self, text: str) -> None:
         self.console.print(f"[notice]⚠ {text}[/notice]")
     
-    def print_step(self, step: str, status: str = "pending") -> None:
+    def print_step(self, step: str, status: str = "pending", device: Optional[str] = None) -> None:
         icons = {
             "pending": "[dim]○[/dim]",
             "progress": "[input]⟳[/input]",
@@ -44,7 +62,10 @@ class RCCConsole:
             "retry": "[notice]↻[/notice]",
         }
         icon = icons.get(status, icons["pending"])
-        self.console.print(f"    {icon} {step}")
+        if device:
+            self.console.print(f"    {icon} [dim]{escape(device)}:[/dim] {step}")
+        else:
+            self.console.print(f"    {icon} {step}")
     
     def show_banner(self, compact: bool = False) -> None:
         print_banner(compact)
@@ -117,6 +138,7 @@ class RCCConsole:
             if default:
                 self.console.print(f" [dim](default: {'*' * len(default)})[/dim]", end="")
             self.console.print(": ", end="")
+            self.console.file.flush()
             value = getpass("")
             return value if value else (default or "")
         else:
@@ -146,22 +168,26 @@ class RCCConsole:
     def prompt_confirm(self, prompt: str, default: bool = True) -> bool:
         return Confirm.ask(f"[input]{prompt}[/input]", default=default)
     
-    def prompt_selection(self, items: List[Tuple[str, str]], prompt: str = "Select", allow_all: bool = False, allow_back: bool = True) -> List[int]:
-        self.console.print()
-        for i, (item_id, description) in enumerate(items, 1):
-            self.console.print(f"[menu.key][{i}][/menu.key] [menu]{item_id}[/menu] [dim]{description}[/dim]")
-        
+    def prompt_selection(self, items: List[Tuple[str, str]], prompt: str = "Select", allow_all: bool = False, allow_back: bool = True, allow_rescan: bool = False) -> Optional[List[int]]:
+        lines = [
+            f"[menu.key][{i}][/menu.key] [menu]{item_id}[/menu] [dim]{description}[/dim]"
+            for i, (item_id, description) in enumerate(items, 1)
+        ]
         if allow_all:
-            self.console.print(f"[menu.key][A][/menu.key] [menu]Select All[/menu]")
+            lines.append("[menu.key][A][/menu.key] [menu]Select All[/menu]")
+        if allow_rescan:
+            lines.append("[menu.key][R][/menu.key] [menu]Rescan[/menu]")
         if allow_back:
-            self.console.print(f"[menu.key][B][/menu.key] [menu]← Back[/menu]")
+            lines.append("[menu.key][B][/menu.key] [menu]← Back[/menu]")
         
-        self.console.print()
+        self.console.print("\n" + "\n".join(lines) + "\n")
         
         # Build valid choices
         valid = [str(i) for i in range(1, len(items) + 1)]
         if allow_all:
             valid.extend(["a", "A"])
+        if allow_rescan:
+            valid.extend(["r", "R"])
         if allow_back:
             valid.extend(["b", "B"])
         
@@ -175,6 +201,9 @@ class RCCConsole:
             if choice == "A" and allow_all:
                 return list(range(len(items)))
             
+            if choice == "R" and allow_rescan:
+                return None
+            
             try:
                 if "," in choice:
                     indices = [int(x.strip()) - 1 for x in choice.split(",")]
@@ -212,6 +241,9 @@ class RCCConsole:
         self.console.print(table)
         self.console.print()
     
+    def status(self, label: str):
+        return self.console.status(f"[info]{label}[/info]", spinner_style="input")
+    
     def show_progress(self, description: str, total: int = 100):
         return Progress(
             SpinnerColumn(style="input"),
@@ -221,6 +253,14 @@ class RCCConsole:
             console=self.console,
         )
     
+    def print_progress_line(self, current: int, total: int, label: str) -> None:
+        # Pre-resolved styles: per-device lines skip markup parsing and escape odd SSIDs.
+        self.console.print(Text.assemble(
+            (f"[{current}/{total}]", self._style_primary),
+            " ",
+            (f"Provisioning {label}", self._style_text),
+        ))
+    
     def show_device_progress(self, device_num: int, total_devices: int, device_id: str, steps: List[Tuple[str, str]]) -> None:
         self.console.print()
         self.console.print(f"[primary][{device_num}/{total_devices}][/primary] [text]Provisioning {device_id}[/text]")
@@ -238,29 +278,38 @@ class RCCConsole:
         
         if devices:
             self.console.print()
-            table = Table(
-                border_style="secondary",
-                header_style="table.header",
-            )
-            table.add_column("Device", style="text")
-            table.add_column("Name", style="info")
-            table.add_column(ip_col_name, style="dim")
-            table.add_column("Status", style="text")
-            
+            table = self.create_results_table(ip_col_name)
             for device in devices:
-                status_style = "success" if device.get("status") == "OK" else "notice"
-                table.add_row(
-                    device.get("mac", "Unknown"),
-                    device.get("name", "N/A"),
-                    device.get("ip", "N/A"),
-                    f"[{status_style}]{device.get('status', 'Unknown')}[/{status_style}]"
-                )
+                self.add_result_row(table, device)
             
             self.console.print(table)
         
         self.console.print()
         print_divider()
     
+    def create_results_table(self, ip_col_name: str = "IP") -> Table:
+        table = Table(
+            border_style="secondary",
+            header_style="table.header",
+        )
+        table.add_column("Device", style="text")
+        table.add_column("Name", style="info")
+        table.add_column(ip_col_name, style="dim")
+        table.add_column("Status", style="text")
+        return table
+    
+    def add_result_row(self, table: Table, device: dict) -> None:
+        status_style = "success" if device.get("status") == "OK" else "notice"
+        table.add_row(
+            device.get("mac", "Unknown"),
+            device.get("name", "N/A"),
+            device.get("ip", "N/A"),
+            f"[{status_style}]{device.get('status', 'Unknown')}[/{status_style}]"
+        )
+    
+    def show_live(self, renderable) -> Live:
+        return Live(renderable, console=self.console, refresh_per_second=4, transient=True)
+    
     def wait_for_key(self, message: str = "Press Enter to continue...") -> None:
         self.console.print()
         Prompt.ask(f"[dim]{message}[/dim]", default="")
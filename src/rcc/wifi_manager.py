@@ -8,6 +8,12 @@ from abc import ABC, abstractmethod
 
 from .ui import get_console
 
+try:
+    import pywifi
+    HAS_PYWIFI = True
+except ImportError:
+    HAS_PYWIFI = False
+
 
 @dataclass
 class WiFiNetwork:
@@ -78,9 +84,13 @@ class WiFiManagerBase(ABC):
             return self.connect(self._original_network, password)
         return False
     
+    def request_rescan(self) -> bool:
+        return False
+    
     def scan_shelly_networks(self) -> List[WiFiNetwork]:
-        all_networks = self.scan_networks()
-        shelly_networks = [n for n in all_networks if n.is_shelly]
+        shelly_networks = [n for n in self.scan_networks() if n.is_shelly]
+        if not shelly_networks and self.request_rescan():
+            shelly_networks = [n for n in self.scan_networks() if n.is_shelly]
         shelly_networks.sort(key=lambda n: n.signal, reverse=True)
         return shelly_networks
     
@@ -109,6 +119,20 @@ class WindowsWiFiManager(WiFiManagerBase):
         except Exception:
             return None
     
+    def request_rescan(self) -> bool:
+        # netsh only lists the adapter's cached results; pywifi can trigger a fresh scan.
+        if not HAS_PYWIFI:
+            return False
+        try:
+            interfaces = pywifi.PyWiFi().interfaces()
+            if not interfaces:
+                return False
+            interfaces[0].scan()
+            time.sleep(4)
+            return True
+        except Exception:
+            return False
+    
     def scan_networks(self) -> List[WiFiNetwork]:
         networks = []
         